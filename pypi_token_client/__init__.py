@@ -2,14 +2,18 @@ from .async_client import AsyncPypiTokenClientSession, async_pypi_token_client
 from .common import (
     AllProjects,
     LoginError,
+    OperationTimeoutError,
     PasswordError,
     SingleProject,
     TokenListEntry,
     TokenScope,
+    TokenScopeError,
     TooManyAttemptsError,
     UsernameError,
 )
 from .credentials import PypiCredentials
+from .metrics import MetricsRecorder
+from .profiling import OperationProfiler
 
 __all__ = [
     "async_pypi_token_client",
@@ -19,8 +23,12 @@ __all__ = [
     "UsernameError",
     "PasswordError",
     "TooManyAttemptsError",
+    "TokenScopeError",
+    "OperationTimeoutError",
     "TokenScope",
     "AllProjects",
     "SingleProject",
     "TokenListEntry",
+    "OperationProfiler",
+    "MetricsRecorder",
 ]
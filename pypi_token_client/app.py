@@ -1,21 +1,36 @@
 import asyncio
-from collections.abc import AsyncIterator
+import json
+import os
+from collections.abc import Awaitable, Callable
 from contextlib import asynccontextmanager
-from itertools import count
 from pathlib import Path
 from pprint import pprint
 from traceback import print_exc
+from typing import TypeVar
 
 from .async_client import AsyncPypiTokenClientSession, async_pypi_token_client
+from .bulk import BulkJobError, load_bulk_operations, run_bulk_operations
 from .common import PasswordError, TokenScope, UsernameError
 from .credentials import (
+    PypiCredentials,
     get_credentials_from_keyring_and_prompt,
     prompt_for_credentials,
     save_credentials_to_keyring,
 )
+from .desired_state import (
+    PartialApplyError,
+    apply_plan,
+    load_desired_tokens,
+    make_plan,
+)
+from .metrics import MetricsRecorder
+from .profiling import OperationProfiler
+from .watch import watch_token_list
 
 max_login_attempts = 3
 
+T = TypeVar("T")
+
 
 class App:
     def __init__(
@@ -25,17 +40,52 @@ class App:
         username: str | None = None,
         password: str | None = None,
         pypi_base_url: str = "https://pypi.org",
+        browser_endpoint: str | None = None,
+        record_har: Path | None = None,
+        replay_har: Path | None = None,
+        profile_to: Path | None = None,
+        profile_threshold: float = 0.0,
+        profile_python: bool = False,
+        metrics_file: Path | None = None,
+        metrics_format: str | None = None,
+        timeout: float | None = None,
+        lazy_login: bool = True,
+        password_confirmation_window: float | None = 300.0,
+        hybrid: bool = False,
     ):
         self.headless = headless
         self.persist_to = persist_to
         self.username = username
         self.password = password
         self.pypi_base_url = pypi_base_url
+        self.browser_endpoint = browser_endpoint
+        self.record_har = record_har
+        self.replay_har = replay_har
+        self.profile_to = profile_to
+        self.profile_threshold = profile_threshold
+        self.profile_python = profile_python
+        self.metrics_file = metrics_file
+        self.metrics_format = metrics_format
+        self.timeout = timeout
+        self.lazy_login = lazy_login
+        self.password_confirmation_window = password_confirmation_window
+        self.hybrid = hybrid
 
-    @asynccontextmanager
-    async def _logged_in_error_handling_session(
+    async def _run_logged_in(
         self,
-    ) -> AsyncIterator[AsyncPypiTokenClientSession]:
+        operation: Callable[[AsyncPypiTokenClientSession], Awaitable[T]],
+        login_first: bool = False,
+    ) -> T:
+        """
+        Run an operation in a session, handling login failures.
+
+        Args:
+            operation: The operation to run.
+            login_first: Always log in before running the operation, even in
+                lazy login mode. Required for operations which don't return
+                (soon), as saving the credentials is offered after logging in
+                in that case instead of after the operation.
+        """
         # don't do anything interactive (e.g. ask about saving to keyring or
         # retry with prompt) if both username and password are provided
         # (generally suggests no interactivity is desired)
@@ -46,24 +96,46 @@ class App:
         ) = get_credentials_from_keyring_and_prompt(
             self.pypi_base_url, self.username, self.password
         )
-        async with async_pypi_token_client(
-            credentials, self.headless, self.persist_to, self.pypi_base_url
+        metrics = MetricsRecorder() if self.metrics_file is not None else None
+        async with self._metrics_written(metrics), async_pypi_token_client(
+            credentials,
+            self.headless,
+            self.persist_to,
+            self.pypi_base_url,
+            browser_endpoint=self.browser_endpoint,
+            record_har=self.record_har,
+            replay_har=self.replay_har,
+            profiler=(
+                OperationProfiler(
+                    self.profile_to,
+                    self.profile_threshold,
+                    self.profile_python,
+                )
+                if self.profile_to is not None
+                else None
+            ),
+            metrics=metrics,
+            password_confirmation_window=self.password_confirmation_window,
+            hybrid=self.hybrid,
         ) as session, self._handle_errors(session):
-            for attempt in count():
-                try:
-                    did_login = await session.login()
+            attempt = 0
+            while True:
+                logins_before = session.login_count
+
+                def _offer_saving_if_logged_in():
+                    nonlocal credentials_are_new
+                    did_login = session.login_count > logins_before
                     if did_login and credentials_are_new and interactive:
-                        save = input(
-                            "success! save credentials to keyring (Y/n)? "
-                        )
-                        if save == "Y":
-                            save_credentials_to_keyring(
-                                self.pypi_base_url, credentials
-                            )
-                            print("saved")
-                        else:
-                            print("not saving")
-                    break
+                        self._offer_saving_credentials(credentials)
+                        credentials_are_new = False
+
+                try:
+                    # in lazy mode, the operation itself logs in if required,
+                    # which saves navigating to the login page beforehand
+                    if login_first or not self.lazy_login:
+                        await session.login(timeout=self.timeout)
+                        _offer_saving_if_logged_in()
+                    return await operation(session)
                 except (UsernameError, PasswordError) as e:
                     print(f"Login failed: {e}")
                     if attempt >= max_login_attempts or not interactive:
@@ -72,7 +144,28 @@ class App:
                     credentials = prompt_for_credentials()
                     credentials_are_new = True
                     session.credentials = credentials
-            yield session
+                finally:
+                    # also offer this if the operation failed for other
+                    # reasons after logging in, as the credentials are valid
+                    _offer_saving_if_logged_in()
+                attempt += 1
+
+    def _offer_saving_credentials(self, credentials: PypiCredentials):
+        save = input("success! save credentials to keyring (Y/n)? ")
+        if save == "Y":
+            save_credentials_to_keyring(self.pypi_base_url, credentials)
+            print("saved")
+        else:
+            print("not saving")
+
+    @asynccontextmanager
+    async def _metrics_written(self, metrics: MetricsRecorder | None):
+        try:
+            yield
+        finally:
+            if metrics is not None:
+                assert self.metrics_file is not None
+                metrics.write(self.metrics_file, self.metrics_format)
 
     @staticmethod
     @asynccontextmanager
@@ -96,28 +189,151 @@ class App:
             exit(1)
 
     def create_token(self, token_name: str, scope: TokenScope) -> None:
-        async def _run():
-            async with self._logged_in_error_handling_session() as session:
-                token = await session.create_token(token_name, scope)
-            print("Created token:")
-            print(token)
+        async def _run(session):
+            return await session.create_token(
+                token_name, scope, timeout=self.timeout
+            )
 
-        asyncio.run(_run())
+        token = asyncio.run(self._run_logged_in(_run))
+        print("Created token:")
+        print(token)
 
     def list_tokens(self) -> None:
-        async def _run():
-            async with self._logged_in_error_handling_session() as session:
-                tokens = await session.get_token_list()
-            pprint(tokens)
+        async def _run(session):
+            return await session.get_token_list(timeout=self.timeout)
 
-        asyncio.run(_run())
+        tokens = asyncio.run(self._run_logged_in(_run))
+        pprint(tokens)
+
+    def list_projects(self) -> None:
+        async def _run(session):
+            return await session.list_projects(timeout=self.timeout)
+
+        projects = asyncio.run(self._run_logged_in(_run))
+        for project in projects:
+            print(project)
 
     def delete_token(
         self,
         name: str,
     ) -> None:
-        async def _run():
-            async with self._logged_in_error_handling_session() as session:
-                await session.delete_token(name)
+        async def _run(session):
+            await session.delete_token(name, timeout=self.timeout)
+
+        asyncio.run(self._run_logged_in(_run))
+
+    def plan_tokens(self, desired_path: Path, prune: bool = False) -> None:
+        desired = load_desired_tokens(desired_path)
+
+        async def _run(session):
+            current = await session.get_token_list(timeout=self.timeout)
+            return make_plan(desired, current, prune)
+
+        plan = asyncio.run(self._run_logged_in(_run))
+        print(json.dumps(plan.to_dict(), indent=2))
+
+    def apply_tokens(
+        self,
+        desired_path: Path,
+        prune: bool = False,
+        concurrency: int = 4,
+        output: Path | None = None,
+    ) -> None:
+        desired = load_desired_tokens(desired_path)
+        created: dict[str, str] = {}
 
-        asyncio.run(_run())
+        def _on_created(name: str, token: str):
+            created[name] = token
+            # write right away so tokens aren't lost if interrupted later on
+            if output is not None:
+                self._write_tokens(output, created)
+
+        async def _run(session):
+            current = await session.get_token_list(timeout=self.timeout)
+            plan = make_plan(desired, current, prune)
+            try:
+                await apply_plan(
+                    session, plan, concurrency, self.timeout, _on_created
+                )
+            except PartialApplyError as e:
+                return plan, e.failures
+            return plan, {}
+
+        try:
+            plan, failures = asyncio.run(self._run_logged_in(_run))
+        except BaseException:
+            if output is None and created:
+                # PyPI never shows them again, so they must not get lost
+                print("Created tokens:")
+                print(json.dumps(created, indent=2))
+            raise
+        result = plan.to_dict()
+        if output is None:
+            result["tokens"] = created
+        else:
+            self._write_tokens(output, created)
+        if failures:
+            result["failures"] = {
+                name: f"{type(e).__name__}: {e}"
+                for name, e in failures.items()
+            }
+        print(json.dumps(result, indent=2))
+        if failures:
+            exit(1)
+
+    @staticmethod
+    def _write_tokens(path: Path, tokens: dict[str, str]):
+        # tokens are secrets, so don't let anyone else read them
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, "w") as f:
+            json.dump(tokens, f, indent=2)
+
+    def watch_tokens(
+        self, interval: float, emit_initial: bool = False
+    ) -> None:
+        async def _run(session):
+            changes = watch_token_list(
+                session, interval, emit_initial, self.timeout
+            )
+            async for polled_at, polled_changes in changes:
+                for change in polled_changes:
+                    line = {"time": polled_at.isoformat(), **change.to_dict()}
+                    print(json.dumps(line), flush=True)
+
+        try:
+            asyncio.run(self._run_logged_in(_run, login_first=True))
+        except KeyboardInterrupt:
+            pass
+
+    def bulk(self, job_path: Path, workers: int | None = None) -> None:
+        # credentials come from the job file or the keyring
+        unsupported_options = {
+            "--username": self.username,
+            "--password": self.password,
+            "--persist": self.persist_to,
+            "--record-har": self.record_har,
+            "--replay-har": self.replay_har,
+            "--profile": self.profile_to,
+            "--metrics-file": self.metrics_file,
+        }
+        for option, value in unsupported_options.items():
+            if value is not None:
+                raise BulkJobError(
+                    f"{option} isn't supported for bulk operations"
+                )
+        operations = load_bulk_operations(job_path, self.pypi_base_url)
+        failed = False
+        for result in run_bulk_operations(
+            operations,
+            workers,
+            self.headless,
+            self.timeout,
+            self.browser_endpoint,
+            self.hybrid,
+            self.lazy_login,
+            self.password_confirmation_window,
+        ):
+            failed = failed or result.status != "ok"
+            print(json.dumps(result.to_dict()), flush=True)
+        if failed:
+            exit(1)
@@ -1,30 +1,52 @@
 """
 `async`/`await`-based PyPI token client
 """
-from asyncio import Lock
-from contextlib import asynccontextmanager
+import json
+from asyncio import CancelledError, Lock
+from asyncio import TimeoutError as AsyncioTimeoutError
+from asyncio import wait_for
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
+from datetime import datetime, timezone
 from functools import wraps
 from logging import Logger, getLogger
 from pathlib import Path
-from typing import AsyncIterator, Sequence
+from time import monotonic, perf_counter, time
+from typing import Any, AsyncIterator, Iterable, Sequence
+from urllib.parse import urljoin, urlsplit
 
-from dateutil.parser import isoparse
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 from playwright.async_api import async_playwright
 
 from .common import (
     AllProjects,
+    OperationTimeoutError,
     PasswordError,
     SingleProject,
     TokenListEntry,
     TokenNameError,
     TokenScope,
+    TokenScopeError,
     TooManyAttemptsError,
     UnexpectedContentError,
     UnexpectedPageError,
     UsernameError,
 )
 from .credentials import PypiCredentials
-from .utils.playwright import launch_ephemeral_chromium_context
+from .fetched_page import FetchedForm, FetchedPage, fetch_page
+from .metrics import MetricsRecorder
+from .page_state import (
+    PageState,
+    fetch_token_table,
+    probe_page_state,
+    read_token_table,
+)
+from .profiling import OperationProfiler
+from .utils.har import HarReplayer, scrub_har
+from .utils.memory import get_descendants_rss
+from .utils.playwright import (
+    connect_to_chromium_context,
+    launch_ephemeral_chromium_context,
+)
 from .utils.sequences import one_or_none
 
 default_logger = getLogger(__name__)
@@ -44,6 +66,15 @@ async def async_pypi_token_client(
     persist_to: Path | str | None = None,
     base_url: str = "https://pypi.org",
     logger: Logger = default_logger,
+    browser_endpoint: str | None = None,
+    recycle_after_operations: int | None = None,
+    recycle_rss_threshold: int | None = None,
+    record_har: Path | str | None = None,
+    replay_har: Path | str | None = None,
+    profiler: OperationProfiler | None = None,
+    metrics: MetricsRecorder | None = None,
+    password_confirmation_window: float | None = 300.0,
+    hybrid: bool = False,
 ) -> AsyncIterator["AsyncPypiTokenClientSession"]:
     """
     Context manager for launching an async client session.
@@ -57,32 +88,168 @@ async def async_pypi_token_client(
             means no persistence.
         base_url: PyPI base URL.
         logger: Logger to log messages to.
+        browser_endpoint: Endpoint URL of an already-running browser server
+            (Playwright or CDP) to connect to instead of launching a new
+            browser. Only a new context will be opened in that browser, so
+            many sessions can share one browser. Can't be combined with
+            ``persist_to``.
+        recycle_after_operations: See :class:`AsyncPypiTokenClientSession`.
+        recycle_rss_threshold: See :class:`AsyncPypiTokenClientSession`.
+        record_har: Path of a HAR file to record all network traffic of the
+            session to. Secrets (all passwords the session was given, PyPI
+            tokens and cookies) are scrubbed from it once the session ends.
+        replay_har: Path of a HAR file previously recorded using
+            ``record_har`` to serve all responses from instead of contacting
+            PyPI. Requests are matched by method and URL only (as secrets
+            have been scrubbed from their bodies), see
+            :class:`~pypi_token_client.utils.har.HarReplayer`. Requests not
+            found in the archive are aborted. Can't be combined with
+            ``record_har``.
+        profiler: Profiler to capture traces and profiles of each operation
+            with.
+        metrics: Recorder to record metrics about the session's operations
+            to.
+        password_confirmation_window: See
+            :class:`AsyncPypiTokenClientSession`. When persisting browser
+            state, the time of the last password confirmation is persisted
+            along with it.
+        hybrid: See :class:`AsyncPypiTokenClientSession`. Requests made this
+            way bypass HAR recording and replaying, so this can't be combined
+            with ``replay_har`` (and won't show up in recorded archives).
 
     Returns:
       A context manager for the async session.
+
+    The browser (or, when connecting to an existing one, only the context
+    opened in it) is closed deterministically when the context manager exits.
     """
+    if browser_endpoint is not None and persist_to is not None:
+        raise ValueError(
+            "persisting browser state is not supported when connecting to "
+            "an existing browser"
+        )
+    if record_har is not None and replay_har is not None:
+        raise ValueError("can't record and replay HAR at the same time")
+    if hybrid and replay_har is not None:
+        raise ValueError("hybrid mode can't be used when replaying HAR")
+    context_options: dict[str, Any] = {}
+    if record_har is not None:
+        context_options.update(
+            record_har_path=str(record_har), record_har_content="embed"
+        )
     async with async_playwright() as p:
-        if persist_to is None:
-            context = await launch_ephemeral_chromium_context(
-                p, headless=headless
+        if browser_endpoint is not None:
+            connect_start = perf_counter()
+            browser, context = await connect_to_chromium_context(
+                p, browser_endpoint, **context_options
+            )
+            logger.info(
+                f"connected to browser at {browser_endpoint} in "
+                f"{perf_counter() - connect_start:.3f}s"
+            )
+        elif persist_to is None:
+            browser, context = await launch_ephemeral_chromium_context(
+                p, headless=headless, **context_options
             )
         else:
+            browser = None
             context = await p.chromium.launch_persistent_context(
-                Path(persist_to), headless=headless
+                Path(persist_to), headless=headless, **context_options
             )
+        if replay_har is not None:
+            await HarReplayer(replay_har).attach(context)
+        if profiler is not None:
+            await profiler.start(context)
+        if metrics is not None:
+            metrics.attach(context)
         pages = context.pages
         assert len(pages) == 1
         page = pages[0]
-        yield AsyncPypiTokenClientSession(
-            context, page, credentials, headless, base_url, logger
+        session = AsyncPypiTokenClientSession(
+            context,
+            page,
+            credentials,
+            headless,
+            base_url,
+            logger,
+            browser=browser,
+            recycle_after_operations=recycle_after_operations,
+            recycle_rss_threshold=recycle_rss_threshold,
+            # HAR recording & routing are bound to the initial context
+            recycle_context=record_har is None and replay_har is None,
+            profiler=profiler,
+            metrics=metrics,
+            password_confirmation_window=password_confirmation_window,
+            state_path=(
+                Path(persist_to) / "pypi-token-client-state.json"
+                if persist_to is not None
+                else None
+            ),
+            hybrid=hybrid,
         )
+        try:
+            yield session
+        finally:
+            try:
+                await session.close()
+            finally:
+                # the HAR is written when the context is closed, which may
+                # have happened even if closing the rest failed
+                if record_har is not None and Path(record_har).exists():
+                    scrub_har(record_har, session.used_passwords)
 
 
 def _with_lock(meth):
+    # besides ensuring only one operation runs at a time, this also enforces
+    # the deadline given by the operation's `timeout` keyword argument and
+    # takes care of everything else that has to happen around operations
     @wraps(meth)
     async def _with_lock(self, *args, **kwargs):
-        async with self._lock:
-            return await meth(self, *args, **kwargs)
+        # public methods that can answer some calls without an operation
+        # (e.g. from a cache) are backed by private ones, which are still
+        # reported under the public name
+        operation = meth.__name__.lstrip("_")
+        timeout = kwargs.get("timeout")
+        called = monotonic()
+        deadline = None if timeout is None else called + timeout
+        # filled in by _run_operation once the operation has run
+        durations = []
+        try:
+            try:
+                result = await wait_for(
+                    self._run_operation(
+                        operation, meth, deadline, durations, args, kwargs
+                    ),
+                    timeout,
+                )
+            except (AsyncioTimeoutError, PlaywrightTimeoutError) as e:
+                if isinstance(e, PlaywrightTimeoutError) and (
+                    deadline is None or monotonic() < deadline
+                ):
+                    # unrelated to our deadline
+                    raise
+                # a wait that ran into the deadline might have left the page
+                # in any state, just like a cancellation
+                self._interrupted = True
+                raise OperationTimeoutError(
+                    f"{operation} didn't finish within {timeout}s"
+                ) from e
+        except BaseException as e:
+            # only now is the type of the exception the caller gets known
+            outcome = type(e).__name__
+            raise
+        else:
+            outcome = "success"
+            return result
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_operation(
+                    operation,
+                    outcome,
+                    # the operation never ran if the deadline passed while
+                    # waiting for other operations
+                    durations[0] if durations else monotonic() - called,
+                )
 
     return _with_lock
 
@@ -99,6 +266,54 @@ class AsyncPypiTokenClientSession:
     operations have to be performed in sequence, it makes sense to do so in the
     a single session to minimize the number of times the browser has to be
     restarted, as this is fairly resource intensive and time consuming.
+
+    For very long-lived sessions, the memory used by the browser's renderer
+    tends to grow over time. To keep it bounded, the session can be told to
+    *recycle* its page after a number of operations or once the RSS of the
+    browser processes exceeds a threshold. For ephemeral sessions, the whole
+    context is replaced by a new one with the same storage state (so login
+    state is kept); for persistent ones, only the page is replaced.
+
+    Args:
+        context: Playwright browser context to use.
+        page: Playwright page (belonging to ``context``) to use.
+        credentials: Credentials to log into PyPI with.
+        headless: Whether the browser is running in headless mode.
+        base_url: PyPI base URL.
+        logger: Logger to log messages to.
+        browser: The browser ``context`` belongs to, if it should be closed
+            together with the session and ephemeral contexts should be
+            recycled within it. ``None`` for persistent contexts.
+        recycle_after_operations: Recycle after this many operations.
+            ``None`` means never recycle based on the number of operations.
+        recycle_rss_threshold: Recycle after an operation if the summed RSS
+            (in bytes) of this process's child processes (browser & Playwright
+            driver) exceeds this value. Only works on Linux. ``None`` means
+            never recycle based on memory usage.
+        recycle_context: Whether recycling should replace the whole context
+            (only possible if ``browser`` is given) or just the page.
+        profiler: Profiler to capture traces and profiles of each operation
+            with. Must already have been started on ``context``.
+        metrics: Recorder to record metrics about the session's operations
+            to. Must already have been attached to ``context``.
+        password_confirmation_window: Number of seconds for which PyPI is
+            assumed not to ask for the password to be confirmed again after
+            logging in or confirming it. Within this window, operations skip
+            checking whether a login or password confirmation is required
+            (if the session already knows it's logged in), falling back to
+            checking after all if the page doesn't look as expected. ``None``
+            means always checking.
+        state_path: File to load the time of the last password confirmation
+            from and save it to when closing, so that it's known across
+            sessions. ``None`` means no persistence.
+        hybrid: Whether to create and delete tokens by fetching PyPI's forms
+            and submitting them directly via HTTP requests (using the
+            context's cookies) once logged in, instead of operating on the
+            rendered page. Falls back to operating on the page if the forms
+            don't look as expected, e.g. because a login or password
+            confirmation is required. Once a form has been submitted, an
+            unexpected response raises ``UnexpectedContentError`` instead, as
+            submitting it again could lose or duplicate tokens.
     """
 
     def __init__(
@@ -109,137 +324,427 @@ class AsyncPypiTokenClientSession:
         headless: bool = True,
         base_url: str = "https://pypi.org",
         logger: Logger = default_logger,
+        browser=None,
+        recycle_after_operations: int | None = None,
+        recycle_rss_threshold: int | None = None,
+        recycle_context: bool = True,
+        profiler: OperationProfiler | None = None,
+        metrics: MetricsRecorder | None = None,
+        password_confirmation_window: float | None = 300.0,
+        state_path: Path | None = None,
+        hybrid: bool = False,
     ):
         self.context = context
         self.page = page
+        self.used_passwords: set[str] = set()
+        """
+        Passwords of all credentials the session has been given so far (e.g.
+        to scrub them from recordings)
+        """
         self.credentials = credentials
         self.headless = headless
         self.base_url = base_url
         self.logger = logger
+        self.browser = browser
+        self.recycle_after_operations = recycle_after_operations
+        self.recycle_rss_threshold = recycle_rss_threshold
+        self.recycle_context = recycle_context
+        self.profiler = profiler
+        self.metrics = metrics
         self._lock = Lock()
+        self._operations_since_recycle = 0
+        self._live_forks = 0
+        self._projects: list[str] | None = None
+        self._token_snapshot: list[TokenListEntry] | None = None
+        self._changed_tokens = False
+        self._deadline: float | None = None
+        self.login_count = 0
+        "Number of logins performed by this session so far"
+        self.password_confirmation_window = password_confirmation_window
+        self.password_confirmed_at: float | None = None
+        "Time (as UNIX timestamp) the password was last confirmed, if known"
+        self.state_path = state_path
+        self._known_logged_in = False
+        if state_path is not None:
+            self._load_state(state_path)
+        self._interrupted = False
+        self.hybrid = hybrid
+
+    @property
+    def credentials(self) -> PypiCredentials:
+        "Credentials to log into PyPI with (can be replaced at any time)"
+        return self._credentials
+
+    @credentials.setter
+    def credentials(self, credentials: PypiCredentials):
+        self._credentials = credentials
+        self.used_passwords.add(credentials.password)
+
+    async def close(self):
+        """
+        Close the session's pages, context and browser.
+
+        Called automatically when leaving :func:`async_pypi_token_client`.
+        """
+        if self.state_path is not None:
+            self._save_state(self.state_path)
+        for page in self.context.pages:
+            await page.close()
+        await self.context.close()
+        if self.browser is not None:
+            await self.browser.close()
 
-    async def _get_logged_in_user(self) -> str | None:
-        user_button = one_or_none(
-            await self.page.locator(
-                "#user-indicator > nav:first-child > button"
-            ).all()
+    @asynccontextmanager
+    async def fork(self) -> AsyncIterator["AsyncPypiTokenClientSession"]:
+        """
+        Context manager for a session operating on a new page in this
+        session's browser context.
+
+        As each session can only perform one operation at a time, this can be
+        used to run operations concurrently. Forked sessions share the login
+        state with the original one. Their page is closed when the context
+        manager exits.
+
+        Forked sessions are never profiled and only ever recycle their page.
+        While any of them are alive, the original session also only recycles
+        its page, as replacing the context would close theirs. Metrics are
+        recorded to the same recorder as the original session.
+        """
+        page = await self.context.new_page()
+        forked = AsyncPypiTokenClientSession(
+            self.context,
+            page,
+            self.credentials,
+            self.headless,
+            self.base_url,
+            self.logger,
+            recycle_after_operations=self.recycle_after_operations,
+            recycle_rss_threshold=self.recycle_rss_threshold,
+            recycle_context=False,
+            metrics=self.metrics,
         )
-        if user_button is None:
-            return None
-        username = (await user_button.inner_text()).strip()
-        return username
+        forked._projects = self._projects
+        forked._known_logged_in = self._known_logged_in
+        forked.password_confirmed_at = self.password_confirmed_at
+        forked.password_confirmation_window = self.password_confirmation_window
+        forked.hybrid = self.hybrid
+        self._live_forks += 1
+        try:
+            yield forked
+        finally:
+            self._live_forks -= 1
+            await forked.page.close()
+            if forked._changed_tokens:
+                # our snapshot doesn't reflect the fork's changes
+                self._token_snapshot = None
+                self._changed_tokens = True
+
+    @asynccontextmanager
+    async def fork_many(
+        self, n: int
+    ) -> AsyncIterator[list["AsyncPypiTokenClientSession"]]:
+        """
+        Context manager for a list of ``n`` sessions for concurrent use.
+
+        The first one is this session itself, the others are created using
+        :meth:`fork`.
+        """
+        async with AsyncExitStack() as stack:
+            forks = [
+                await stack.enter_async_context(self.fork())
+                for _ in range(n - 1)
+            ]
+            yield [self, *forks]
+
+    async def _run_operation(
+        self, operation, meth, deadline, durations, args, kwargs
+    ):
+        async with self._lock:
+            if self._interrupted:
+                # the previous operation might have left the page in any
+                # state (e.g. in the middle of a navigation), so start over
+                self.logger.info("replacing page after interrupted operation")
+                await self._recycle(page_only=True)
+                self._interrupted = False
+            self._deadline = deadline
+            self.page.set_default_timeout(self._remaining_ms(30000))
+            start = perf_counter()
+            try:
+                async with self._profiled(operation):
+                    result = await meth(self, *args, **kwargs)
+            except CancelledError:
+                self._interrupted = True
+                raise
+            finally:
+                self._deadline = None
+                durations.append(perf_counter() - start)
+            self._operations_since_recycle += 1
+            await self._recycle_if_necessary()
+            return result
+
+    def _remaining_ms(self, cap: float) -> float:
+        """
+        Timeout in ms for a single wait within the current operation.
+
+        This is the given cap or the time remaining until the operation's
+        deadline, whichever is smaller.
+        """
+        if self._deadline is None:
+            return cap
+        # 0 would mean "no timeout" to Playwright
+        remaining = max((self._deadline - monotonic()) * 1000, 1)
+        return min(cap, remaining)
+
+    def _profiled(self, operation: str):
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.profile(self.context, operation)
+
+    def _load_state(self, path: Path):
+        try:
+            state = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return
+        if state.get("username") == self.credentials.username:
+            self.password_confirmed_at = state.get("password_confirmed_at")
+            # if the persisted login has since expired, we'll end up on the
+            # login page, which is detected without any extra checks
+            self._known_logged_in = self.password_confirmed_at is not None
+
+    def _save_state(self, path: Path):
+        path.write_text(
+            json.dumps(
+                {
+                    "username": self.credentials.username,
+                    "password_confirmed_at": self.password_confirmed_at,
+                }
+            )
+        )
+
+    async def _recycle_if_necessary(self):
+        if (
+            self.recycle_after_operations is not None
+            and self._operations_since_recycle >= self.recycle_after_operations
+        ):
+            self.logger.info(
+                f"recycling after {self._operations_since_recycle} "
+                "operations..."
+            )
+            await self._recycle()
+            return
+        if self.recycle_rss_threshold is not None:
+            rss = get_descendants_rss()
+            if rss is not None and rss > self.recycle_rss_threshold:
+                self.logger.info(
+                    f"recycling because browser RSS ({rss} bytes) exceeds "
+                    f"threshold ({self.recycle_rss_threshold} bytes)..."
+                )
+                await self._recycle()
 
-    async def _handle_login(self) -> bool:
+    async def _recycle(self, page_only: bool = False):
+        if (
+            self.browser is not None
+            and self.recycle_context
+            and not page_only
+            # forks use our context
+            and not self._live_forks
+        ):
+            storage_state = await self.context.storage_state()
+            new_context = await self.browser.new_context(
+                storage_state=storage_state
+            )
+            new_page = await new_context.new_page()
+            if self.profiler is not None:
+                await self.profiler.start(new_context)
+            if self.metrics is not None:
+                self.metrics.attach(new_context)
+            await self.context.close()
+            self.context = new_context
+        else:
+            new_page = await self.context.new_page()
+            await self.page.close()
+        self.page = new_page
+        self._operations_since_recycle = 0
+
+    async def _handle_login(self, state: PageState | None = None) -> bool:
         """
         Automatically handle login if necessary, otherwise do nothing.
 
+        Args:
+            state: State of the current page if already known, otherwise it
+                will be probed.
+
         Returns:
             `True` if a login was actually performed, `False` if nothing was
             done.
         """
-        logged_in_user = await self._get_logged_in_user()
-        if logged_in_user is not None:
-            if logged_in_user == self.credentials.username:
+        if state is None:
+            state = await probe_page_state(self.page)
+        if state.logged_in_user is not None:
+            if state.logged_in_user == self.credentials.username:
                 self.logger.info("no login required")
+                self._known_logged_in = True
                 return False
             else:
                 # TODO log out & go to login page
                 raise NotImplementedError(
-                    f"logged-in user {logged_in_user!r} doesn't match "
+                    f"logged-in user {state.logged_in_user!r} doesn't match "
                     f"credential username {self.credentials.username!r}, "
                     "which can't be handled yet"
                 )
-        if not self.page.url.startswith(
+        if not state.url.startswith(
             self.base_url.rstrip("/") + "/account/login/"
         ):
             self.logger.info("no login required")
             return False
-        username_input = one_or_none(
-            await self.page.locator("#username").all()
-        )
-        if not username_input:
+        if not state.has_username_input:
             raise UnexpectedContentError(
                 "username field not found on login page"
             )
-        password_input = one_or_none(
-            await self.page.locator("#password").all()
-        )
-        if not password_input:
+        if not state.has_password_input:
             raise UnexpectedContentError(
                 "password field not found on login page"
             )
-        await username_input.fill(self.credentials.username)
+        await self.page.locator("#username").fill(self.credentials.username)
+        password_input = self.page.locator("#password")
         await password_input.fill(self.credentials.password)
         async with self.page.expect_event(
             "domcontentloaded"
         ), self.page.expect_navigation():
             self.logger.info("logging in...")
             await password_input.press("Enter")
-        if self.page.url.startswith(
-            self.base_url.rstrip("/") + "/account/login/"
-        ):
-            username_errors_or_none = one_or_none(
-                await self.page.locator("#username-errors ul li").all()
-            )
-            username_error = (
-                await username_errors_or_none.inner_text()
-                if username_errors_or_none is not None
-                else None
-            )
-            if username_error is not None:
-                raise UsernameError(username_error)
-            password_errors_or_none = one_or_none(
-                await self.page.locator("#password-errors ul li").all()
-            )
-            password_error = (
-                await password_errors_or_none.inner_text()
-                if password_errors_or_none is not None
-                else None
-            )
-            if password_error is not None:
+        state = await probe_page_state(self.page)
+        if state.url.startswith(self.base_url.rstrip("/") + "/account/login/"):
+            if state.username_errors:
+                raise UsernameError(state.username_errors[0])
+            if state.password_errors:
+                password_error = state.password_errors[0]
                 if "too many unsuccessful login attempts" in password_error:
                     raise TooManyAttemptsError(password_error)
                 else:
                     raise PasswordError(password_error)
+        self.login_count += 1
+        if self.metrics is not None:
+            self.metrics.record_login()
+        self._known_logged_in = True
+        # PyPI doesn't ask to confirm the password right after logging in
+        self.password_confirmed_at = time()
         return True
 
-    async def _confirm_password(self):
-        confirm_heading = one_or_none(
-            await self.page.get_by_text("Confirm password to continue").all()
-        )
-        if not confirm_heading:
+    async def _confirm_password(self, state: PageState | None = None):
+        """
+        Automatically confirm password if asked to, otherwise do nothing.
+
+        Args:
+            state: State of the current page if already known, otherwise it
+                will be probed.
+        """
+        if state is None:
+            state = await probe_page_state(self.page)
+        if not state.sudo_prompt:
             self.logger.info("no password confirmation required")
             return
-        password_input = one_or_none(
-            await self.page.locator("#password").all()
-        )
-        if not password_input:
+        if not state.has_password_input:
             raise UnexpectedContentError("no password field found")
-            return
+        password_input = self.page.locator("#password")
         await password_input.fill(self.credentials.password)
         async with self.page.expect_event(
             "domcontentloaded"
         ), self.page.expect_navigation():
             self.logger.info("confirming password...")
             await password_input.press("Enter")
+        self.password_confirmed_at = time()
+        if self.metrics is not None:
+            self.metrics.record_password_confirmation()
 
-    async def wait_until_closed(self):
+    def _password_confirmation_known_valid(self) -> bool:
+        return (
+            self.password_confirmation_window is not None
+            and self.password_confirmed_at is not None
+            and time() - self.password_confirmed_at
+            < self.password_confirmation_window
+        )
+
+    async def _handle_login_and_confirmation(self) -> bool:
+        """
+        Log in and/or confirm password if necessary, otherwise do nothing.
+
+        Only probes the page's state once if neither is necessary, and not at
+        all if we know we're logged in and within the password confirmation
+        window (unless we ended up on the login page).
+
+        Returns:
+            `True` if checking was skipped, in which case callers must call
+            :meth:`_recheck_login_and_confirmation` if the page's contents
+            don't look as expected.
+        """
+        if (
+            self._known_logged_in
+            and self._password_confirmation_known_valid()
+            and not self.page.url.startswith(
+                self.base_url.rstrip("/") + "/account/login/"
+            )
+        ):
+            self.logger.info(
+                "skipping login & password confirmation checks "
+                "(password confirmed recently)"
+            )
+            return True
+        state = await probe_page_state(self.page)
+        if await self._handle_login(state):
+            # we navigated away so the state is outdated
+            if not self._password_confirmation_known_valid():
+                await self._confirm_password()
+        else:
+            await self._confirm_password(state)
+        return False
+
+    async def _recheck_login_and_confirmation(self):
+        """
+        Forget what we know about login & password confirmation state and
+        handle both as necessary.
+        """
+        self.logger.info(
+            "page doesn't look as expected, checking for login & password "
+            "confirmation after all"
+        )
+        self._known_logged_in = False
+        self.password_confirmed_at = None
+        await self._handle_login_and_confirmation()
+
+    async def wait_until_closed(self, *, timeout: float | None = None):
         """
         Wait until the user closes the browser if it's not headless.
 
         Has no effect and returns immediately in headless mode.
+
+        Args:
+            timeout: Maximum time to wait in seconds. ``None`` means waiting
+                indefinitely.
         """
 
-        await self.page.wait_for_event("close", timeout=0)
+        try:
+            await self.page.wait_for_event(
+                "close", timeout=0 if timeout is None else timeout * 1000
+            )
+        except PlaywrightTimeoutError as e:
+            raise OperationTimeoutError(
+                f"browser wasn't closed within {timeout}s"
+            ) from e
 
     @_with_lock
-    async def create_token(self, name: str, scope: TokenScope) -> str:
+    async def create_token(
+        self, name: str, scope: TokenScope, *, timeout: float | None = None
+    ) -> str:
         """
         Create a new token on PyPI.
 
         Args:
             name: Name of the token to create.
             scope: The token's desired scope.
+            timeout: Overall deadline for the operation in seconds (including
+                waiting for other operations of this session to finish).
+                ``None`` means no deadline.
 
         Returns:
             The created token.
@@ -251,17 +756,29 @@ class AsyncPypiTokenClientSession:
             scope_selector_value = f"scope:project:{scope.name}"
         else:
             raise TypeError(f"invalid token scope: {scope}")
+        # fail early if we already know the project doesn't exist
+        self._validate_scopes_against_cache([scope])
         # /validate args
+        if self.hybrid and self._known_logged_in:
+            token = await self._create_token_via_http(
+                name, scope, scope_selector_value
+            )
+            if token is not None:
+                self._snapshot_created(name, scope)
+                return token
         await self.page.goto(
             self.base_url + "/manage/account/token/",
             wait_until="domcontentloaded",
         )
-        # login if necessary
-        await self._handle_login()
-        # confirm password if necessary
-        await self._confirm_password()
+        # login and confirm password if necessary
+        skipped_checks = await self._handle_login_and_confirmation()
         # fill in token name field
         name_input = one_or_none(await self.page.locator("#description").all())
+        if name_input is None and skipped_checks:
+            await self._recheck_login_and_confirmation()
+            name_input = one_or_none(
+                await self.page.locator("#description").all()
+            )
         if name_input is None:
             raise UnexpectedContentError("no token name field found on page")
         await name_input.fill(name)
@@ -271,6 +788,10 @@ class AsyncPypiTokenClientSession:
         )
         if scope_selector is None:
             raise UnexpectedContentError("no scope selector found on page")
+        # selecting a nonexistent option would just time out, so check first
+        # (the project list comes for free here, so refresh the cache too)
+        self._projects = await self._read_projects_from_scope_selector()
+        self._validate_scopes_against_cache([scope])
         await scope_selector.select_option(value=scope_selector_value)
         async with self.page.expect_event(
             "domcontentloaded"
@@ -293,10 +814,303 @@ class AsyncPypiTokenClientSession:
         if not token_block:
             raise UnexpectedContentError("no token block found on page")
         token = await token_block.inner_text()
+        self._snapshot_created(name, scope)
         return token
 
+    async def _fetch(self, url: str, **kwargs) -> FetchedPage:
+        return await fetch_page(
+            self.context.request,
+            self.page,
+            url,
+            self._remaining_ms(30000),
+            **kwargs,
+        )
+
+    async def _submit(
+        self, page: FetchedPage, form: FetchedForm, fields: dict[str, str]
+    ) -> FetchedPage:
+        origin = "{0.scheme}://{0.netloc}".format(urlsplit(self.base_url))
+        return await self._fetch(
+            urljoin(page.url, form.action or ""),
+            method=form.method,
+            form={**form.hidden_fields, **fields},
+            # required by PyPI's CSRF protection in addition to the token
+            headers={"Origin": origin, "Referer": page.url},
+        )
+
+    def _fall_back_to_page(self, what: str) -> None:
+        self.logger.info(
+            f"{what} doesn't look as expected, falling back to operating on "
+            "the page"
+        )
+
+    async def _create_token_via_http(
+        self, name: str, scope: TokenScope, scope_selector_value: str
+    ) -> str | None:
+        """
+        Create a token by submitting the creation form via HTTP.
+
+        Only falls back to operating on the page before anything was
+        submitted.
+
+        Returns:
+            The created token, or ``None`` if :meth:`create_token` should fall
+            back to operating on the page.
+
+        Raises:
+            UnexpectedContentError: If the response to submitting the form
+                doesn't look as expected.
+        """
+        token_url = self.base_url + "/manage/account/token/"
+        token_page = await self._fetch(token_url)
+        form = token_page.form_containing("description")
+        if (
+            token_page.status != 200
+            or token_page.url != token_url
+            or form is None
+            or form.method != "POST"
+            or "csrf_token" not in form.hidden_fields
+            or "token_scope" not in form.element_ids
+        ):
+            self._fall_back_to_page("token creation page")
+            return None
+        # the project list comes for free here, so refresh the cache
+        self._projects = [
+            value.removeprefix("scope:project:")
+            for value in token_page.scope_options
+            if value.startswith("scope:project:")
+        ]
+        self._validate_scopes_against_cache([scope])
+        if scope_selector_value not in token_page.scope_options:
+            self._fall_back_to_page("token scope selector")
+            return None
+        self.logger.info(f"creating token {name!r} via HTTP...")
+        result = await self._submit(
+            token_page,
+            form,
+            {"description": name, "token_scope": scope_selector_value},
+        )
+        if result.token_name_errors:
+            raise TokenNameError(result.token_name_errors[0])
+        if result.status != 200 or result.provisioned_key is None:
+            # the token might have been created anyway, so retrying on the
+            # page could lose it (PyPI shows tokens only once) or clash
+            raise UnexpectedContentError(
+                f"unexpected response to creating token {name!r} "
+                f"(status {result.status}, URL {result.url}); it may or may "
+                "not have been created"
+            )
+        return result.provisioned_key
+
+    async def _delete_token_via_http(self, name: str) -> bool:
+        """
+        Delete a token by submitting its removal form via HTTP.
+
+        Returns:
+            ``True`` if the token was deleted or there is none with this name,
+            ``False`` if :meth:`delete_token` should fall back to operating on
+            the page (only before anything was submitted).
+
+        Raises:
+            UnexpectedContentError: If the response to submitting the form
+                doesn't look as expected.
+        """
+        account_url = self.base_url + "/manage/account/"
+        account_page = await self._fetch(account_url)
+        if (
+            account_page.status != 200
+            or account_page.url != account_url
+            or not account_page.has_token_section
+        ):
+            self._fall_back_to_page("account page")
+            return False
+        forms = [
+            form
+            for form in account_page.forms
+            if form.row_name == name
+            and form.method == "POST"
+            and form.password_field is not None
+            and "csrf_token" in form.hidden_fields
+        ]
+        if len(forms) != 1:
+            listed = account_page.token_list or []
+            if (
+                forms
+                or any(f.row_name == name for f in account_page.forms)
+                # the form might just not be where we expect it
+                or any(t.name == name for t in listed)
+            ):
+                self._fall_back_to_page("token removal form")
+                return False
+            self.logger.info(f"no token named {name} found. nothing to do")
+            self._token_snapshot = listed
+            return True
+        (form,) = forms
+        assert form.password_field is not None
+        self.logger.info(f"deleting token {name!r} via HTTP...")
+        result = await self._submit(
+            account_page,
+            form,
+            {form.password_field: self.credentials.password},
+        )
+        if result.status != 200 or "Deleted API token" not in result.body_text:
+            # don't submit again when we don't know what the first one did
+            raise UnexpectedContentError(
+                f"unexpected response to deleting token {name!r} "
+                f"(status {result.status}, URL {result.url}); it may or may "
+                "not have been deleted"
+            )
+        self.logger.info(f"deleted token {name!r}")
+        self._snapshot_deleted(name, result.token_list)
+        return True
+
+    async def _read_token_table(
+        self, skipped_checks: bool
+    ) -> list[TokenListEntry]:
+        state = await probe_page_state(self.page)
+        if not state.has_token_table and skipped_checks:
+            await self._recheck_login_and_confirmation()
+            state = await probe_page_state(self.page)
+        token_list = state.token_list
+        if token_list is None:
+            # no section at all probably just means there are no tokens
+            token_list = []
+        self._token_snapshot = token_list
+        return list(token_list)
+
+    def _snapshot_created(self, name: str, scope: TokenScope):
+        self._changed_tokens = True
+        if self._token_snapshot is None:
+            return
+        # the creation time is only known approximately without reloading
+        self._token_snapshot = [
+            t for t in self._token_snapshot if t.name != name
+        ] + [TokenListEntry(name, scope, datetime.now(timezone.utc), None)]
+
+    def _snapshot_deleted(
+        self, name: str, token_list_after: list[TokenListEntry] | None
+    ):
+        """
+        Args:
+            name: Name of the deleted token.
+            token_list_after: Token list read from the page PyPI showed after
+                deleting the token, if any.
+        """
+        self._changed_tokens = True
+        if token_list_after is not None:
+            self._token_snapshot = token_list_after
+        elif self._token_snapshot is not None:
+            self._token_snapshot = [
+                t for t in self._token_snapshot if t.name != name
+            ]
+
+    async def _read_projects_from_scope_selector(self) -> list[str]:
+        option_values = await self.page.locator(
+            "#token_scope option"
+        ).evaluate_all("options => options.map(option => option.value)")
+        return [
+            value.removeprefix("scope:project:")
+            for value in option_values
+            if value.startswith("scope:project:")
+        ]
+
+    def _validate_scopes_against_cache(self, scopes: Iterable[TokenScope]):
+        if self._projects is None:
+            return
+        unknown_projects = sorted(
+            {
+                scope.name
+                for scope in scopes
+                if isinstance(scope, SingleProject)
+                and scope.name not in self._projects
+            }
+        )
+        if unknown_projects:
+            raise TokenScopeError(
+                "no token can be scoped to these projects (which either "
+                "don't exist or aren't yours): " + ", ".join(unknown_projects)
+            )
+
+    async def list_projects(
+        self, use_cache: bool = False, *, timeout: float | None = None
+    ) -> Sequence[str]:
+        """
+        Get the names of all projects tokens can be scoped to.
+
+        These are read from the scope selector on the token creation page.
+
+        The result is cached within the session and used to validate scopes
+        locally, see :meth:`validate_scopes`.
+
+        Args:
+            use_cache: Return the cached project list if there is one instead
+                of fetching it again (without waiting for other operations of
+                this session).
+            timeout: Overall deadline for the operation in seconds (including
+                waiting for other operations of this session to finish).
+                ``None`` means no deadline.
+
+        Returns:
+            List of project names.
+        """
+        if use_cache and self._projects is not None:
+            # no need to wait for (or count as) an operation
+            return list(self._projects)
+        return await self._list_projects(timeout=timeout)
+
     @_with_lock
-    async def login(self) -> bool:
+    async def _list_projects(
+        self, *, timeout: float | None = None
+    ) -> Sequence[str]:
+        await self.page.goto(
+            self.base_url + "/manage/account/token/",
+            wait_until="domcontentloaded",
+        )
+        # login and confirm password if necessary
+        skipped_checks = await self._handle_login_and_confirmation()
+        scope_selector = one_or_none(
+            await self.page.locator("#token_scope").all()
+        )
+        if scope_selector is None and skipped_checks:
+            await self._recheck_login_and_confirmation()
+            scope_selector = one_or_none(
+                await self.page.locator("#token_scope").all()
+            )
+        if scope_selector is None:
+            raise UnexpectedContentError("no scope selector found on page")
+        self._projects = await self._read_projects_from_scope_selector()
+        return list(self._projects)
+
+    async def validate_scopes(
+        self, scopes: Iterable[TokenScope], *, timeout: float | None = None
+    ):
+        """
+        Check that tokens can be created with the given scopes.
+
+        Uses the session's cached project list, which is fetched using
+        :meth:`list_projects` if there is none yet, so this only needs to
+        visit PyPI once per session. Useful for failing early before creating
+        many tokens.
+
+        Args:
+            scopes: Scopes to check.
+            timeout: Overall deadline for the operation in seconds (including
+                waiting for other operations of this session to finish).
+                ``None`` means no deadline.
+
+        Raises:
+            TokenScopeError: If any of the scopes refer to projects which
+                tokens can't be scoped to.
+        """
+        scopes = list(scopes)
+        if self._projects is None and any(
+            isinstance(scope, SingleProject) for scope in scopes
+        ):
+            await self.list_projects(timeout=timeout)
+        self._validate_scopes_against_cache(scopes)
+
+    @_with_lock
+    async def login(self, *, timeout: float | None = None) -> bool:
         """
         Log into PyPI if necessary.
 
@@ -309,6 +1123,11 @@ class AsyncPypiTokenClientSession:
         session's current state (resulting from loaded persistent browser state
         or prior actions) isn't already logged in.
 
+        Args:
+            timeout: Overall deadline for the operation in seconds (including
+                waiting for other operations of this session to finish).
+                ``None`` means no deadline.
+
         Returns:
             `True` if a login was actually performed, `False` if nothing was
             done.
@@ -320,78 +1139,117 @@ class AsyncPypiTokenClientSession:
         # login if necessary
         return await self._handle_login()
 
-    @_with_lock
-    async def get_token_list(self) -> Sequence[TokenListEntry]:
+    async def get_token_list(
+        self, use_cache: bool = False, *, timeout: float | None = None
+    ) -> Sequence[TokenListEntry]:
         """
         Get list of tokens for the logged-in account on PyPI.
 
+        The result is kept as a snapshot within the session, which
+        :meth:`create_token` and :meth:`delete_token` keep up to date: tokens
+        created by this session are added to it (with their creation time
+        approximated locally) and after deletions, it is replaced by the token
+        list on the page PyPI shows afterwards. Changes made outside of the
+        session are only picked up by fetching the list again.
+
+        Args:
+            use_cache: Return the snapshot if there is one instead of
+                fetching the list again (without waiting for other operations
+                of this session).
+            timeout: Overall deadline for the operation in seconds (including
+                waiting for other operations of this session to finish).
+                ``None`` means no deadline.
+
         Returns:
             List of tokens.
         """
+        if use_cache and self._token_snapshot is not None:
+            # no need to wait for (or count as) an operation
+            return list(self._token_snapshot)
+        return await self._get_token_list(timeout=timeout)
+
+    @_with_lock
+    async def _get_token_list(
+        self, *, timeout: float | None = None
+    ) -> Sequence[TokenListEntry]:
         await self.page.goto(
             self.base_url + "/manage/account/",
             wait_until="domcontentloaded",
         )
-        # login if necessary
-        await self._handle_login()
-        # confirm password if necessary
-        await self._confirm_password()
+        # login and confirm password if necessary
+        skipped_checks = await self._handle_login_and_confirmation()
         # get list
-        token_rows = await self.page.locator(
-            "#api-tokens > table > tbody > tr"
-        ).all()
-        token_list = []
-        for row in token_rows:
-            cols = await row.locator("th,td").all()
-            name = await cols[0].inner_text()
-            scope_str = await cols[1].inner_text()
-            scope = (
-                AllProjects()
-                if scope_str == "All projects"
-                else SingleProject(scope_str)
-            )
-            created = isoparse(
-                await one_or_none(
-                    await cols[2].locator("time").all()
-                ).get_attribute("datetime")
-            )
-            last_used_time_elem = one_or_none(
-                await cols[3].locator("time").all()
-            )
-            last_used = (
-                isoparse(await last_used_time_elem.get_attribute("datetime"))
-                if last_used_time_elem is not None
-                else None
+        return await self._read_token_table(skipped_checks)
+
+    @_with_lock
+    async def refresh_token_list(
+        self, *, timeout: float | None = None
+    ) -> Sequence[TokenListEntry]:
+        """
+        Get list of tokens like :meth:`get_token_list`, but cheaper when
+        called repeatedly.
+
+        If the session's page is already on PyPI, only the account page's HTML
+        is fetched from within it and its token table parsed, without
+        navigating or rendering anything. Otherwise, or if the response
+        doesn't contain a token table (e.g. because a login or password
+        confirmation is required), this falls back to :meth:`get_token_list`'s
+        behavior.
+
+        Args:
+            timeout: Overall deadline for the operation in seconds (including
+                waiting for other operations of this session to finish).
+                ``None`` means no deadline.
+
+        Returns:
+            List of tokens.
+        """
+        account_url = self.base_url + "/manage/account/"
+        if self._known_logged_in and self.page.url.startswith(
+            self.base_url.rstrip("/") + "/"
+        ):
+            token_list = await fetch_token_table(self.page, account_url)
+            if token_list is not None:
+                self._token_snapshot = token_list
+                return list(token_list)
+            self.logger.info(
+                "fetched account page has no token table, reloading it"
             )
-            entry = TokenListEntry(name, scope, created, last_used)
-            token_list.append(entry)
-        return token_list
+        await self.page.goto(account_url, wait_until="domcontentloaded")
+        skipped_checks = await self._handle_login_and_confirmation()
+        return await self._read_token_table(skipped_checks)
 
     @_with_lock
-    async def delete_token(self, name: str):
+    async def delete_token(self, name: str, *, timeout: float | None = None):
         """
         Delete token on PyPI.
 
         Args:
             name: Name of the token to delete.
+            timeout: Overall deadline for the operation in seconds (including
+                waiting for other operations of this session to finish).
+                ``None`` means no deadline.
         """
+        if self.hybrid and self._known_logged_in:
+            if await self._delete_token_via_http(name):
+                return
         await self.page.goto(
             self.base_url + "/manage/account/",
             wait_until="domcontentloaded",
         )
-        # login if necessary
-        await self._handle_login()
-        # confirm password if necessary
-        await self._confirm_password()
+        # login and confirm password if necessary
+        skipped_checks = await self._handle_login_and_confirmation()
         # get list
-        token_rows = await self.page.locator(
-            "#api-tokens > table > tbody > tr"
-        ).all()
-        for row in token_rows:
-            cols = await row.locator("th,td").all()
-            listed_name = await cols[0].inner_text()
-            if listed_name != name:
+        token_list = await self._read_token_table(skipped_checks)
+        for i, entry in enumerate(token_list):
+            if entry.name != name:
                 continue
+            cols = (
+                await self.page.locator("#api-tokens > table > tbody > tr")
+                .nth(i)
+                .locator("th,td")
+                .all()
+            )
             options_button = one_or_none(
                 await cols[4]
                 .locator("nav > button")
@@ -406,7 +1264,9 @@ class AsyncPypiTokenClientSession:
             remove_button = (
                 cols[4].locator("nav a").get_by_text("Remove token")
             )
-            await remove_button.wait_for(state="visible", timeout=5000)
+            await remove_button.wait_for(
+                state="visible", timeout=self._remaining_ms(5000)
+            )
             await remove_button.click()
             confirm_dialog_heading = self.page.get_by_text(
                 f"Remove API token - {name}", exact=True
@@ -414,7 +1274,9 @@ class AsyncPypiTokenClientSession:
             confirm_dialog = self.page.locator(
                 'div[role="dialog"]', has=confirm_dialog_heading
             )
-            await confirm_dialog.wait_for(state="visible", timeout=5000)
+            await confirm_dialog.wait_for(
+                state="visible", timeout=self._remaining_ms(5000)
+            )
             password_input = one_or_none(
                 await confirm_dialog.locator('input[type="password"]').all()
             )
@@ -427,9 +1289,11 @@ class AsyncPypiTokenClientSession:
                 self.logger.info(f"deleting token {name!r}...")
                 await password_input.press("Enter")
             await self.page.get_by_text("Deleted API token").wait_for(
-                state="visible", timeout=5000
+                state="visible", timeout=self._remaining_ms(5000)
             )
             self.logger.info(f"deleted token {name!r}")
+            # we're back on the account page, which lists the other tokens
+            self._snapshot_deleted(name, await read_token_table(self.page))
             return
         else:
             self.logger.info(f"no token named {name} found. nothing to do")
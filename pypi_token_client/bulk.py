@@ -0,0 +1,424 @@
+"""
+Bulk token operations across many accounts, sharded over worker processes.
+
+Each worker process drives its own browser session, so the work isn't limited
+by a single event loop (and hence a single CPU core) in the parent process.
+"""
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from traceback import format_exception_only
+from typing import Any, Sequence
+
+from .async_client import AsyncPypiTokenClientSession, async_pypi_token_client
+from .common import (
+    AllProjects,
+    LoginError,
+    SingleProject,
+    TokenListEntry,
+    TokenScope,
+)
+from .credentials import PypiCredentials, get_credentials_from_keyring
+from .utils.files import load_data_file
+
+actions = ("create", "delete", "list")
+
+
+class BulkJobError(Exception):
+    pass
+
+
+@dataclass
+class BulkOperation:
+    index: int
+    "Position of the operation in the job"
+    base_url: str
+    "Base URL of the PyPI instance to perform the operation on"
+    username: str
+    "Account to perform the operation with"
+    action: str
+    "One of ``create``, ``delete`` and ``list``"
+    name: str | None = None
+    "Name of the token to create or delete"
+    scope: TokenScope = field(default_factory=AllProjects)
+    "Scope of the token to create"
+    password_env: str | None = None
+    """
+    Environment variable containing the account's password (looked up in the
+    keyring if not given)
+    """
+
+    @property
+    def shard_key(self) -> tuple[str, str]:
+        return self.base_url, self.username
+
+
+@dataclass
+class BulkResult:
+    operation: BulkOperation
+    status: str
+    "``ok``, ``error`` or ``skipped``"
+    token: str | None = None
+    "Created token (``create`` only)"
+    tokens: list[TokenListEntry] | None = None
+    "Existing tokens (``list`` only)"
+    error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Machine-readable (JSON-serializable) representation of the result.
+        """
+        op = self.operation
+        d: dict[str, Any] = {
+            "index": op.index,
+            "base_url": op.base_url,
+            "username": op.username,
+            "action": op.action,
+            "name": op.name,
+            "status": self.status,
+        }
+        if self.token is not None:
+            d["token"] = self.token
+        if self.tokens is not None:
+            d["tokens"] = [t.to_dict() for t in self.tokens]
+        if self.error is not None:
+            d["error"] = self.error
+        return d
+
+
+def parse_bulk_operations(
+    data: Any, default_base_url: str = "https://pypi.org"
+) -> list[BulkOperation]:
+    """
+    Parse bulk operations from deserialized TOML/YAML/JSON data.
+
+    The data must be a mapping with an ``operations`` key containing a list
+    of mappings with ``username`` and ``action`` keys and, depending on the
+    action, ``name`` and ``project`` keys. ``base_url`` and ``password_env``
+    are optional.
+    """
+    if not isinstance(data, dict) or not isinstance(
+        data.get("operations"), list
+    ):
+        raise BulkJobError("expected a mapping with a list of 'operations'")
+    operations = []
+    for i, item in enumerate(data["operations"]):
+        if not isinstance(item, dict):
+            raise BulkJobError(f"operation #{i} is not a mapping")
+        unknown_keys = set(item) - {
+            "base_url",
+            "username",
+            "action",
+            "name",
+            "project",
+            "password_env",
+        }
+        if unknown_keys:
+            raise BulkJobError(
+                f"unknown keys for operation #{i}: "
+                + ", ".join(sorted(unknown_keys))
+            )
+        for key in ("base_url", "name", "project", "password_env"):
+            if key in item and not isinstance(item[key], str):
+                raise BulkJobError(f"invalid {key} for operation #{i}")
+        if not isinstance(item.get("username"), str):
+            raise BulkJobError(f"operation #{i} has no valid username")
+        action = item.get("action")
+        if action not in actions:
+            raise BulkJobError(
+                f"operation #{i} has no valid action "
+                f"(expected one of: {', '.join(actions)})"
+            )
+        if action != "list" and "name" not in item:
+            raise BulkJobError(f"operation #{i} requires a token name")
+        project = item.get("project")
+        operations.append(
+            BulkOperation(
+                i,
+                item.get("base_url", default_base_url),
+                item["username"],
+                action,
+                item.get("name"),
+                AllProjects() if project is None else SingleProject(project),
+                item.get("password_env"),
+            )
+        )
+    return operations
+
+
+def load_bulk_operations(
+    path: Path | str, default_base_url: str = "https://pypi.org"
+) -> list[BulkOperation]:
+    """
+    Load bulk operations from a TOML, YAML or JSON file.
+
+    The format is determined from the file extension. See
+    :func:`parse_bulk_operations` for the expected structure.
+    """
+    try:
+        data = load_data_file(path)
+    except ValueError as e:
+        raise BulkJobError(str(e)) from e
+    return parse_bulk_operations(data, default_base_url)
+
+
+def shard_operations(
+    operations: Sequence[BulkOperation],
+) -> list[list[BulkOperation]]:
+    """
+    Split operations into shards by PyPI instance and account.
+
+    Operations within a shard keep their relative order. Shards are sorted by
+    size, largest first, so that they are distributed evenly over workers.
+    """
+    shards: dict[tuple[str, str], list[BulkOperation]] = {}
+    for op in operations:
+        shards.setdefault(op.shard_key, []).append(op)
+    return sorted(shards.values(), key=len, reverse=True)
+
+
+@dataclass
+class _WorkerOptions:
+    headless: bool
+    timeout: float | None
+    browser_endpoint: str | None
+    hybrid: bool
+    lazy_login: bool
+    password_confirmation_window: float | None
+
+
+def run_bulk_operations(
+    operations: Sequence[BulkOperation],
+    workers: int | None = None,
+    headless: bool = True,
+    timeout: float | None = None,
+    browser_endpoint: str | None = None,
+    hybrid: bool = False,
+    lazy_login: bool = True,
+    password_confirmation_window: float | None = 300.0,
+) -> Iterator[BulkResult]:
+    """
+    Perform bulk operations using a pool of worker processes.
+
+    Each shard (see :func:`shard_operations`) is processed by a single worker
+    using its own session, so operations on the same account are never
+    performed concurrently.
+
+    Results are yielded in the order of the operations as soon as they (and
+    all results before them) are available.
+
+    When iterating in the main thread, ``SIGINT`` (Ctrl+C) and ``SIGTERM``
+    are handled until the iteration ends: the first one makes the workers
+    finish their current operations and mark the remaining ones as skipped,
+    which are then still yielded. A second one raises
+    :class:`KeyboardInterrupt` and terminates the workers immediately. The
+    workers (and the browsers they launch) run in their own sessions, so
+    signals sent to the whole process group (e.g. by the terminal or a batch
+    scheduler) only reach the parent process.
+
+    Args:
+        operations: The operations to perform.
+        workers: Number of worker processes. Defaults to the number of CPUs.
+            Never more than the number of shards are started.
+        headless: Whether to run the browsers headless.
+        timeout: Deadline in seconds for each individual operation.
+            ``None`` means no deadline.
+        browser_endpoint: Browser to connect to instead of launching one per
+            worker.
+        hybrid: Whether the workers' sessions should use hybrid mode, see
+            :class:`~pypi_token_client.AsyncPypiTokenClientSession`.
+        lazy_login: Whether to only log in when an operation requires it
+            instead of before each shard's first operation.
+        password_confirmation_window: See
+            :class:`~pypi_token_client.AsyncPypiTokenClientSession`.
+
+    Returns:
+        Iterator over the results.
+    """
+    shards = shard_operations(operations)
+    if not shards:
+        return
+    n_workers = min(workers or os.cpu_count() or 1, len(shards))
+    # spawn rather than fork, as forking a process that may have started
+    # threads (e.g. by Playwright) isn't safe
+    mp = multiprocessing.get_context("spawn")
+    tasks = mp.Queue()
+    results = mp.Queue()
+    stop = mp.Event()
+    for shard in shards:
+        tasks.put(shard)
+    for _ in range(n_workers):
+        tasks.put(None)
+    options = _WorkerOptions(
+        headless,
+        timeout,
+        browser_endpoint,
+        hybrid,
+        lazy_login,
+        password_confirmation_window,
+    )
+    processes = [
+        mp.Process(
+            target=_worker_main,
+            args=(tasks, results, stop, options),
+            daemon=True,
+        )
+        for _ in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+
+    def _request_stop(signum, frame):
+        if stop.is_set():
+            raise KeyboardInterrupt
+        stop.set()
+
+    previous_handlers = {}
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            previous_handlers[signum] = signal.signal(signum, _request_stop)
+
+    by_index = {op.index: op for op in operations}
+    pending: dict[int, BulkResult] = {}
+    order = sorted(by_index)
+    position = 0
+    try:
+        while position < len(order):
+            alive = any(p.is_alive() for p in processes)
+            try:
+                result = results.get(timeout=1)
+            except queue.Empty:
+                if alive:
+                    continue
+                # workers died without reporting everything
+                for index in order[position:]:
+                    pending.setdefault(
+                        index,
+                        BulkResult(
+                            by_index[index],
+                            "error",
+                            error="worker exited unexpectedly",
+                        ),
+                    )
+            else:
+                pending[result.operation.index] = result
+            while position < len(order) and order[position] in pending:
+                yield pending.pop(order[position])
+                position += 1
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        if position < len(order):
+            # abandoned or interrupted twice => don't wait for anything
+            for process in processes:
+                process.terminate()
+        for process in processes:
+            process.join()
+
+
+def _worker_main(tasks, results, stop, options: _WorkerOptions) -> None:
+    # interrupts are handled by the parent, which tells us to stop via the
+    # event. signals sent to the whole process group (Ctrl+C, batch
+    # schedulers) would otherwise abort operations halfway through, either by
+    # killing us or by making Playwright close the browser (which is why
+    # ignoring them here wouldn't be enough), so leave the group entirely
+    if hasattr(os, "setsid"):
+        os.setsid()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while (shard := tasks.get()) is not None:
+        asyncio.run(_run_shard(shard, results, stop, options))
+
+
+async def _run_shard(
+    shard: list[BulkOperation], results, stop, options: _WorkerOptions
+) -> None:
+    reported = 0
+
+    def _report(result: BulkResult):
+        nonlocal reported
+        results.put(result)
+        reported += 1
+
+    def _report_rest(status: str, error: str | None = None):
+        for op in shard[reported:]:
+            _report(BulkResult(op, status, error=error))
+
+    first = shard[0]
+    try:
+        credentials = _get_credentials(first)
+    except BulkJobError as e:
+        _report_rest("error", str(e))
+        return
+    try:
+        async with async_pypi_token_client(
+            credentials,
+            options.headless,
+            base_url=first.base_url,
+            browser_endpoint=options.browser_endpoint,
+            hybrid=options.hybrid,
+            password_confirmation_window=options.password_confirmation_window,
+        ) as session:
+            if not options.lazy_login:
+                # a failure is reported for all operations of the shard
+                await session.login(timeout=options.timeout)
+            for op in shard:
+                if stop.is_set():
+                    _report_rest("skipped")
+                    return
+                try:
+                    result = await _perform(session, op, options.timeout)
+                except LoginError as e:
+                    # all other operations would fail the same way and
+                    # retrying might get the account locked
+                    _report_rest("error", _describe(e))
+                    return
+                except Exception as e:
+                    result = BulkResult(op, "error", error=_describe(e))
+                _report(result)
+    except Exception as e:
+        # e.g. the browser couldn't be launched or closed
+        _report_rest("error", _describe(e))
+
+
+async def _perform(
+    session: AsyncPypiTokenClientSession,
+    op: BulkOperation,
+    timeout: float | None,
+) -> BulkResult:
+    if op.action == "create":
+        assert op.name is not None
+        token = await session.create_token(op.name, op.scope, timeout=timeout)
+        return BulkResult(op, "ok", token=token)
+    elif op.action == "delete":
+        assert op.name is not None
+        await session.delete_token(op.name, timeout=timeout)
+        return BulkResult(op, "ok")
+    else:
+        tokens = await session.get_token_list(timeout=timeout)
+        return BulkResult(op, "ok", tokens=list(tokens))
+
+
+def _get_credentials(op: BulkOperation) -> PypiCredentials:
+    if op.password_env is not None:
+        password = os.environ.get(op.password_env)
+        if password is None:
+            raise BulkJobError(
+                f"environment variable {op.password_env!r} is not set"
+            )
+        return PypiCredentials(op.username, password)
+    credentials = get_credentials_from_keyring(op.base_url, op.username)
+    if credentials is None:
+        raise BulkJobError(
+            f"no password for {op.username!r} on {op.base_url} in keyring"
+        )
+    return credentials
+
+
+def _describe(e: BaseException) -> str:
+    return "".join(format_exception_only(type(e), e)).strip()
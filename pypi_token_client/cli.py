@@ -1,5 +1,6 @@
 import logging
 from dataclasses import dataclass
+from enum import Enum
 from pathlib import Path
 
 import typer
@@ -7,6 +8,8 @@ import typer
 from pypi_token_client.common import AllProjects, SingleProject
 
 from .app import App
+from .bulk import BulkJobError
+from .desired_state import DesiredStateError
 
 cli_app = typer.Typer(
     context_settings={
@@ -15,6 +18,11 @@ cli_app = typer.Typer(
 )
 
 
+class MetricsFormat(str, Enum):
+    prometheus = "prometheus"
+    json = "json"
+
+
 @dataclass
 class TyperState:
     headless: bool
@@ -22,6 +30,18 @@ class TyperState:
     username: str | None
     password: str | None
     pypi_base_url: str = "https://pypi.org"
+    browser_endpoint: str | None = None
+    record_har: Path | None = None
+    replay_har: Path | None = None
+    profile_to: Path | None = None
+    profile_threshold: float = 0.0
+    profile_python: bool = False
+    metrics_file: Path | None = None
+    metrics_format: str | None = None
+    timeout: float | None = None
+    lazy_login: bool = True
+    password_confirmation_window: float | None = 300.0
+    hybrid: bool = False
 
 
 def _app_from_typer_state(state: TyperState) -> App:
@@ -31,6 +51,18 @@ def _app_from_typer_state(state: TyperState) -> App:
         state.username,
         state.password,
         state.pypi_base_url,
+        state.browser_endpoint,
+        state.record_har,
+        state.replay_har,
+        state.profile_to,
+        state.profile_threshold,
+        state.profile_python,
+        state.metrics_file,
+        state.metrics_format,
+        state.timeout,
+        state.lazy_login,
+        state.password_confirmation_window,
+        state.hybrid,
     )
 
 
@@ -66,6 +98,77 @@ def typer_callback(
     pypi_base_url: str = typer.Option(
         "https://pypi.org", help="base URL of the pypi website to use"
     ),
+    browser_endpoint: str = typer.Option(
+        None,
+        metavar="URL",
+        help="connect to an already-running browser server (Playwright "
+        "ws:// endpoint or CDP http:// endpoint) instead of launching a new "
+        "browser; can't be combined with --persist",
+    ),
+    record_har: str = typer.Option(
+        None,
+        metavar="PATH",
+        help="record all network traffic to a HAR file (with secrets "
+        "scrubbed) for later use with --replay-har",
+    ),
+    replay_har: str = typer.Option(
+        None,
+        metavar="PATH",
+        help="serve all responses from a HAR file recorded with --record-har "
+        "instead of contacting PyPI",
+    ),
+    profile_to: str = typer.Option(
+        None,
+        "--profile",
+        metavar="DIR",
+        help="save a Playwright trace of each operation to this directory",
+    ),
+    profile_threshold: float = typer.Option(
+        0.0,
+        metavar="SECONDS",
+        help="only keep profiling artifacts for operations taking at least "
+        "this long",
+    ),
+    profile_python: bool = typer.Option(
+        False,
+        help="also save a cProfile dump of each operation "
+        "(only has an effect in combination with --profile)",
+    ),
+    metrics_file: str = typer.Option(
+        None,
+        metavar="PATH",
+        help="write metrics about the run (operation counts & latencies, "
+        "logins, navigations, peak memory usage) to this file at the end",
+    ),
+    metrics_format: MetricsFormat = typer.Option(
+        None,
+        help="format of the metrics file (default: json if the file name "
+        "ends in .json, prometheus otherwise)",
+    ),
+    timeout: float = typer.Option(
+        None,
+        metavar="SECONDS",
+        help="abort each operation on PyPI (login, create, list, ...) if it "
+        "takes longer than this",
+    ),
+    lazy_login: bool = typer.Option(
+        True,
+        help="only log in once the actual operation requires it instead of "
+        "visiting the login page first (saves a page load)",
+    ),
+    password_confirmation_window: float = typer.Option(
+        300.0,
+        metavar="SECONDS",
+        help="assume PyPI won't ask to confirm the password again for this "
+        "long after the last confirmation/login and skip checking for it "
+        "(falls back to checking if necessary; 0 to always check)",
+    ),
+    hybrid: bool = typer.Option(
+        False,
+        help="once logged in, create and delete tokens by submitting PyPI's "
+        "forms via direct HTTP requests instead of operating on the rendered "
+        "page (falls back to the latter if anything looks unexpected)",
+    ),
 ):
     ctx.obj = TyperState(
         headless,
@@ -73,6 +176,18 @@ def typer_callback(
         username,
         password,
         pypi_base_url,
+        browser_endpoint,
+        Path(record_har) if record_har is not None else None,
+        Path(replay_har) if replay_har is not None else None,
+        Path(profile_to) if profile_to is not None else None,
+        profile_threshold,
+        profile_python,
+        Path(metrics_file) if metrics_file is not None else None,
+        metrics_format.value if metrics_format is not None else None,
+        timeout,
+        lazy_login,
+        password_confirmation_window or None,
+        hybrid,
     )
 
 
@@ -101,6 +216,15 @@ def list_tokens(ctx: typer.Context):
     app.list_tokens()
 
 
+@cli_app.command()
+def projects(ctx: typer.Context):
+    """
+    List projects tokens can be scoped to
+    """
+    app = _app_from_typer_state(ctx.obj)
+    app.list_projects()
+
+
 @cli_app.command()
 def delete(
     ctx: typer.Context,
@@ -113,6 +237,119 @@ def delete(
     app.delete_token(name)
 
 
+@cli_app.command()
+def plan(
+    ctx: typer.Context,
+    desired_state: Path = typer.Argument(
+        ...,
+        help="TOML, YAML or JSON file listing the tokens that should exist",
+    ),
+    prune: bool = typer.Option(
+        False, help="plan to delete existing tokens that aren't listed"
+    ),
+):
+    """
+    Show changes necessary to reach a desired state as JSON
+    """
+    app = _app_from_typer_state(ctx.obj)
+    try:
+        app.plan_tokens(desired_state, prune)
+    except DesiredStateError as e:
+        typer.echo(f"invalid desired state: {e}", err=True)
+        raise typer.Exit(1)
+
+
+@cli_app.command()
+def apply(
+    ctx: typer.Context,
+    desired_state: Path = typer.Argument(
+        ...,
+        help="TOML, YAML or JSON file listing the tokens that should exist",
+    ),
+    prune: bool = typer.Option(
+        False, help="delete existing tokens that aren't listed"
+    ),
+    concurrency: int = typer.Option(
+        4, min=1, help="maximum number of operations to run concurrently"
+    ),
+    output: Path = typer.Option(
+        None,
+        metavar="PATH",
+        help="write created tokens to this file as JSON "
+        "(included in the printed output if not given)",
+    ),
+):
+    """
+    Create and delete tokens as necessary to reach a desired state
+    """
+    app = _app_from_typer_state(ctx.obj)
+    try:
+        app.apply_tokens(desired_state, prune, concurrency, output)
+    except DesiredStateError as e:
+        typer.echo(f"invalid desired state: {e}", err=True)
+        raise typer.Exit(1)
+
+
+def _parse_duration(value: str) -> float:
+    units = {"s": 1, "m": 60, "h": 3600}
+    try:
+        if value and value[-1] in units:
+            seconds = float(value[:-1]) * units[value[-1]]
+        else:
+            seconds = float(value)
+    except ValueError:
+        raise typer.BadParameter(
+            f"invalid duration {value!r} (expected e.g. 30, 30s, 5m or 1h)"
+        )
+    if seconds <= 0:
+        raise typer.BadParameter("duration must be positive")
+    return seconds
+
+
+@cli_app.command()
+def watch(
+    ctx: typer.Context,
+    interval: str = typer.Option(
+        "60s",
+        metavar="DURATION",
+        help="time between polls, in seconds or with a unit (s, m or h)",
+    ),
+    initial: bool = typer.Option(
+        False, help="report the tokens that exist at first as added"
+    ),
+):
+    """
+    Watch the token list and print changes to it as JSON Lines until
+    interrupted
+    """
+    app = _app_from_typer_state(ctx.obj)
+    app.watch_tokens(_parse_duration(interval), initial)
+
+
+@cli_app.command()
+def bulk(
+    ctx: typer.Context,
+    job: Path = typer.Argument(
+        ..., help="TOML, YAML or JSON file listing the operations to perform"
+    ),
+    workers: int = typer.Option(
+        None,
+        min=1,
+        help="number of worker processes, each with its own browser "
+        "(default: number of CPUs)",
+    ),
+):
+    """
+    Perform many operations across accounts, printing results as JSON Lines
+    """
+    app = _app_from_typer_state(ctx.obj)
+    try:
+        app.bulk(job, workers)
+    except BulkJobError as e:
+        typer.echo(f"can't run bulk job: {e}", err=True)
+        raise typer.Exit(1)
+
+
 def cli_main():
     # it seems that there is no way around setting global state with Python's
     # own logging module, so setting this up is done in the outermost layer
@@ -4,6 +4,7 @@ Data structures common to both sync and async client.
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
+from typing import Any
 
 user_data_dir = str(Path("~/.autopypitok/persist-chromium").expanduser())
 max_login_attempts = 3
@@ -37,6 +38,14 @@ class TokenNameError(Exception):
     pass
 
 
+class TokenScopeError(Exception):
+    pass
+
+
+class OperationTimeoutError(TimeoutError):
+    pass
+
+
 @dataclass
 class TokenScope:
     pass
@@ -59,3 +68,25 @@ class TokenListEntry:
     scope: TokenScope
     created: datetime
     last_used: datetime | None
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Machine-readable (JSON-serializable) representation of the entry.
+
+        The scope is given as the name of the project, or ``None`` for tokens
+        scoped to all projects.
+        """
+        return {
+            "name": self.name,
+            "project": (
+                self.scope.name
+                if isinstance(self.scope, SingleProject)
+                else None
+            ),
+            "created": self.created.isoformat(),
+            "last_used": (
+                self.last_used.isoformat()
+                if self.last_used is not None
+                else None
+            ),
+        }
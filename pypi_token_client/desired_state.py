@@ -0,0 +1,287 @@
+"""
+Declarative management of the tokens an account should have.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Sequence
+
+from .common import AllProjects, SingleProject, TokenListEntry, TokenScope
+from .utils.files import load_data_file
+
+
+class DesiredStateError(Exception):
+    pass
+
+
+class PartialApplyError(Exception):
+    """
+    Raised when some of the changes in a plan couldn't be performed.
+
+    Tokens that were created nonetheless are available via ``created``, as
+    their secrets can't be retrieved from PyPI later.
+    """
+
+    def __init__(
+        self, created: dict[str, str], failures: dict[str, BaseException]
+    ):
+        super().__init__(
+            "failed to apply changes to these tokens: "
+            + ", ".join(
+                f"{name} ({type(e).__name__}: {e})"
+                for name, e in failures.items()
+            )
+        )
+        self.created = created
+        "Mapping of the names of created tokens to the tokens themselves"
+        self.failures = failures
+        "Mapping of the names of tokens that couldn't be changed to the errors"
+
+
+@dataclass
+class DesiredToken:
+    name: str
+    "Name of the token"
+    scope: TokenScope
+    "Scope the token should have"
+
+
+@dataclass
+class PlannedCreation:
+    token: DesiredToken
+    "Token to create"
+    reason: str
+    "Why it has to be created"
+
+
+@dataclass
+class PlannedDeletion:
+    token: TokenListEntry
+    "Token to delete"
+    reason: str
+    "Why it has to be deleted"
+
+
+@dataclass
+class TokenPlan:
+    """
+    Minimal set of changes required to reach a desired state.
+
+    Tokens whose scope differs from the desired one are both deleted and
+    re-created, as PyPI doesn't allow changing the scope of existing tokens.
+    """
+
+    creations: list[PlannedCreation] = field(default_factory=list)
+    deletions: list[PlannedDeletion] = field(default_factory=list)
+    unchanged: list[TokenListEntry] = field(default_factory=list)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.creations or self.deletions)
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Machine-readable (JSON-serializable) representation of the plan.
+        """
+        return {
+            "has_changes": self.has_changes,
+            "create": [
+                {
+                    "name": c.token.name,
+                    "project": _scope_to_project(c.token.scope),
+                    "reason": c.reason,
+                }
+                for c in self.creations
+            ],
+            "delete": [
+                {
+                    "name": d.token.name,
+                    "project": _scope_to_project(d.token.scope),
+                    "reason": d.reason,
+                }
+                for d in self.deletions
+            ],
+            "unchanged": [t.name for t in self.unchanged],
+        }
+
+
+def _scope_to_project(scope: TokenScope) -> str | None:
+    return scope.name if isinstance(scope, SingleProject) else None
+
+
+def parse_desired_tokens(data: Any) -> list[DesiredToken]:
+    """
+    Parse desired tokens from deserialized TOML/YAML/JSON data.
+
+    The data must be a mapping with a ``tokens`` key containing a list of
+    mappings with a ``name`` key and an optional ``project`` key (if
+    omitted, the token is scoped to all projects).
+    """
+    if not isinstance(data, dict) or not isinstance(
+        data.get("tokens", []), list
+    ):
+        raise DesiredStateError("expected a mapping with a list of 'tokens'")
+    desired_tokens = []
+    seen_names = set()
+    for i, item in enumerate(data.get("tokens", [])):
+        if not isinstance(item, dict) or not isinstance(item.get("name"), str):
+            raise DesiredStateError(f"token #{i} has no valid name")
+        unknown_keys = set(item) - {"name", "project"}
+        if unknown_keys:
+            raise DesiredStateError(
+                f"unknown keys for token {item['name']!r}: "
+                + ", ".join(sorted(unknown_keys))
+            )
+        name = item["name"]
+        if name in seen_names:
+            raise DesiredStateError(f"duplicate token name {name!r}")
+        seen_names.add(name)
+        project = item.get("project")
+        if project is not None and not isinstance(project, str):
+            raise DesiredStateError(f"invalid project for token {name!r}")
+        scope = AllProjects() if project is None else SingleProject(project)
+        desired_tokens.append(DesiredToken(name, scope))
+    return desired_tokens
+
+
+def load_desired_tokens(path: Path | str) -> list[DesiredToken]:
+    """
+    Load desired tokens from a TOML, YAML or JSON file.
+
+    The format is determined from the file extension. See
+    :func:`parse_desired_tokens` for the expected structure.
+    """
+    try:
+        data = load_data_file(path)
+    except ValueError as e:
+        raise DesiredStateError(str(e)) from e
+    return parse_desired_tokens(data)
+
+
+def make_plan(
+    desired: Sequence[DesiredToken],
+    current: Sequence[TokenListEntry],
+    prune: bool = False,
+) -> TokenPlan:
+    """
+    Determine which tokens have to be created and deleted.
+
+    Args:
+        desired: Tokens that should exist.
+        current: Tokens that actually exist.
+        prune: Whether to delete existing tokens that aren't desired.
+
+    Returns:
+        The plan.
+    """
+    plan = TokenPlan()
+    current_by_name = {t.name: t for t in current}
+    desired_names = {t.name for t in desired}
+    for desired_token in desired:
+        existing = current_by_name.get(desired_token.name)
+        if existing is None:
+            plan.creations.append(PlannedCreation(desired_token, "missing"))
+        elif existing.scope != desired_token.scope:
+            plan.deletions.append(PlannedDeletion(existing, "scope differs"))
+            plan.creations.append(
+                PlannedCreation(desired_token, "scope differs")
+            )
+        else:
+            plan.unchanged.append(existing)
+    if prune:
+        for existing in current:
+            if existing.name not in desired_names:
+                plan.deletions.append(PlannedDeletion(existing, "undesired"))
+    return plan
+
+
+async def apply_plan(
+    session,
+    plan: TokenPlan,
+    concurrency: int = 4,
+    timeout: float | None = None,
+    on_created: Callable[[str, str], None] | None = None,
+) -> dict[str, str]:
+    """
+    Perform the changes in a plan.
+
+    All scopes are validated before anything is changed. All deletions are
+    performed before any creations so that tokens which have to be
+    re-created don't clash with their old versions. If any deletion fails,
+    no tokens are created. A failing creation doesn't stop the others.
+
+    Args:
+        session: :class:`~pypi_token_client.AsyncPypiTokenClientSession` to
+            perform the changes with.
+        plan: The plan.
+        concurrency: Maximum number of operations to run concurrently, each
+            on its own page within the session's browser context.
+        timeout: Deadline in seconds for each individual operation.
+            ``None`` means no deadline.
+        on_created: Called with the name and the token itself right after
+            each token is created, e.g. to persist it even if applying the
+            plan is interrupted later on.
+
+    Returns:
+        Mapping of the names of created tokens to the tokens themselves.
+
+    Raises:
+        PartialApplyError: If any of the changes failed, after all others
+            have been performed.
+    """
+    # fail before changing anything if any of the scopes are invalid
+    await session.validate_scopes(
+        (c.token.scope for c in plan.creations), timeout=timeout
+    )
+    async with session.fork_many(concurrency) as workers:
+        free_workers: asyncio.Queue = asyncio.Queue()
+        for worker in workers:
+            free_workers.put_nowait(worker)
+
+        created: dict[str, str] = {}
+        failures: dict[str, BaseException] = {}
+
+        async def _delete(deletion: PlannedDeletion):
+            worker = await free_workers.get()
+            try:
+                await worker.delete_token(deletion.token.name, timeout=timeout)
+            except Exception as e:
+                failures[deletion.token.name] = e
+            finally:
+                free_workers.put_nowait(worker)
+
+        async def _create(creation: PlannedCreation):
+            worker = await free_workers.get()
+            try:
+                token = await worker.create_token(
+                    creation.token.name, creation.token.scope, timeout=timeout
+                )
+            except Exception as e:
+                failures[creation.token.name] = e
+                return
+            finally:
+                free_workers.put_nowait(worker)
+            created[creation.token.name] = token
+            if on_created is not None:
+                on_created(creation.token.name, token)
+
+        await _gather_or_cancel(*(_delete(d) for d in plan.deletions))
+        if failures:
+            raise PartialApplyError(created, failures)
+        await _gather_or_cancel(*(_create(c) for c in plan.creations))
+    if failures:
+        raise PartialApplyError(created, failures)
+    return created
+
+
+async def _gather_or_cancel(*coros):
+    # like asyncio.gather, but cancels the remaining tasks if interrupted
+    # instead of leaving them running in the background
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -0,0 +1,132 @@
+"""
+Analysis of PyPI pages fetched outside of the browser's page.
+"""
+from dataclasses import dataclass
+
+from .common import TokenListEntry
+from .page_state import _parse_token_table_rows, _token_table_rows_js
+
+# evaluated in the page so the HTML is parsed by the browser (the same way it
+# would be when navigating to it) but without rendering it
+_analyze_html_js = """
+(html) => {
+  const doc = new DOMParser().parseFromString(html, "text/html");
+  const text = (el) => el.innerText.replace(/\\s+/g, " ").trim();
+  const texts = (selector) => Array.from(doc.querySelectorAll(selector), text);
+  const provisionedKey = doc.querySelector("#provisioned-key > code");
+  return {
+    forms: Array.from(doc.querySelectorAll("form"), (form) => {
+      const row = form.closest("tr");
+      const rowHeader = row === null ? null : row.querySelector("th, td");
+      const passwordInput = form.querySelector(
+        'input[type="password"][name]'
+      );
+      return {
+        action: form.getAttribute("action"),
+        method: (form.getAttribute("method") || "GET").toUpperCase(),
+        hidden_fields: Object.fromEntries(
+          Array.from(
+            form.querySelectorAll('input[type="hidden"][name]'),
+            (input) => [input.name, input.value]
+          )
+        ),
+        element_ids: Array.from(
+          form.querySelectorAll("[id]"), (el) => el.id
+        ),
+        password_field: passwordInput === null ? null : passwordInput.name,
+        row_name: rowHeader === null ? null : text(rowHeader),
+      };
+    }),
+    scope_options: Array.from(
+      doc.querySelectorAll("#token_scope option"), (option) => option.value
+    ),
+    provisioned_key: provisionedKey === null ? null : text(provisionedKey),
+    token_name_errors: texts("#token-name-errors ul li"),
+    has_token_section: doc.querySelector("#api-tokens") !== null,
+    token_rows: (TOKEN_TABLE_ROWS)(doc),
+    body_text: doc.body === null ? "" : text(doc.body),
+  };
+}
+""".replace(
+    "TOKEN_TABLE_ROWS", _token_table_rows_js.strip()
+)
+
+
+@dataclass
+class FetchedForm:
+    action: str | None
+    "Value of the form's ``action`` attribute"
+    method: str
+    "HTTP method (uppercase)"
+    hidden_fields: dict[str, str]
+    "Names and values of hidden inputs (e.g. the CSRF token)"
+    element_ids: list[str]
+    "IDs of all elements within the form"
+    password_field: str | None
+    "Name of the form's password input, if any"
+    row_name: str | None
+    "Text of the first cell of the table row containing the form, if any"
+
+
+@dataclass
+class FetchedPage:
+    """
+    Structured description of what's on a fetched PyPI page.
+    """
+
+    url: str
+    "Final URL (after redirects)"
+    status: int
+    "HTTP status code"
+    forms: list[FetchedForm]
+    "All forms on the page"
+    scope_options: list[str]
+    "Values of the token scope selector's options"
+    provisioned_key: str | None
+    "Newly created token shown on the page, if any"
+    token_name_errors: list[str]
+    "Error messages shown for the token name field"
+    has_token_section: bool
+    "Whether the page has an API token section (which may be empty)"
+    token_list: list[TokenListEntry] | None
+    "Tokens listed in the API token section, if there is one"
+    body_text: str
+    "Text content of the page's body (whitespace-normalized)"
+
+    def form_containing(self, element_id: str) -> FetchedForm | None:
+        """
+        The form containing the element with the given ID, if there is
+        exactly one.
+        """
+        forms = [f for f in self.forms if element_id in f.element_ids]
+        return forms[0] if len(forms) == 1 else None
+
+
+async def fetch_page(request, page, url: str, timeout: float, **kwargs):
+    """
+    Perform a request using a Playwright API request context and analyze the
+    response's HTML.
+
+    Args:
+        request: Playwright ``APIRequestContext`` (e.g. a browser context's
+            ``request`` attribute, which shares its cookies).
+        page: Playwright page to parse the HTML in (its contents are left
+            untouched).
+        url: URL to request.
+        timeout: Timeout for the request in ms.
+        kwargs: Passed on to ``request.fetch`` (e.g. ``method`` and
+            ``form``).
+
+    Returns:
+        The :class:`FetchedPage`.
+    """
+    response = await request.fetch(url, timeout=timeout, **kwargs)
+    html = await response.text()
+    analysis = await page.evaluate(_analyze_html_js, html)
+    return FetchedPage(
+        response.url,
+        response.status,
+        [FetchedForm(**form) for form in analysis.pop("forms")],
+        token_list=_parse_token_table_rows(analysis.pop("token_rows")),
+        **analysis,
+    )
@@ -0,0 +1,282 @@
+"""
+Collection and file export of metrics about a run.
+"""
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from time import time
+from typing import Any
+
+from .utils.memory import get_descendants_rss, get_rss
+
+default_buckets = (0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 60.0)
+metric_prefix = "pypi_token_client"
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...]
+    "Upper bounds of the buckets (excluding +Inf)"
+    bucket_counts: list[int] = field(init=False)
+    "Number of observations in each bucket (not cumulative)"
+    count: int = 0
+    sum: float = 0.0
+
+    def __post_init__(self):
+        self.bucket_counts = [0] * len(self.buckets)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def cumulative_counts(self) -> list[int]:
+        cumulative = []
+        total = 0
+        for bucket_count in self.bucket_counts:
+            total += bucket_count
+            cumulative.append(total)
+        return cumulative
+
+
+class MetricsRecorder:
+    """
+    Records metrics about the operations performed by sessions.
+
+    Meant for runs that can't be scraped live (e.g. cron jobs): metrics are
+    accumulated over the run and written to a file at the end using
+    :meth:`write`, either in Prometheus' text format (suitable for the node
+    exporter's textfile collector) or as JSON.
+
+    Args:
+        buckets: Upper bounds (in seconds) of the operation latency histogram
+            buckets.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = default_buckets):
+        self.buckets = buckets
+        self.operations: dict[tuple[str, str], int] = {}
+        "Number of operations by operation name and outcome"
+        self.latencies: dict[str, Histogram] = {}
+        "Latency histogram by operation name"
+        self.logins = 0
+        self.password_confirmations = 0
+        self.navigations = 0
+        self.peak_browser_rss: int | None = None
+        self.peak_python_rss: int | None = None
+
+    def record_operation(self, operation: str, outcome: str, duration: float):
+        """
+        Record a finished operation.
+
+        Args:
+            operation: Name of the operation (session method).
+            outcome: ``"success"`` or the name of the raised exception type.
+            duration: Duration of the operation in seconds.
+        """
+        key = (operation, outcome)
+        self.operations[key] = self.operations.get(key, 0) + 1
+        self.latencies.setdefault(operation, Histogram(self.buckets)).observe(
+            duration
+        )
+        self.sample_memory()
+
+    def record_login(self):
+        self.logins += 1
+
+    def record_password_confirmation(self):
+        self.password_confirmations += 1
+
+    def sample_memory(self):
+        """
+        Update peak memory usage with the current one (Linux only).
+        """
+        browser_rss = get_descendants_rss()
+        if browser_rss is not None:
+            self.peak_browser_rss = max(
+                self.peak_browser_rss or 0, browser_rss
+            )
+        python_rss = get_rss()
+        if python_rss is not None:
+            self.peak_python_rss = max(self.peak_python_rss or 0, python_rss)
+
+    def attach(self, context):
+        """
+        Count main frame navigations of all (current & future) pages in a
+        browser context.
+        """
+
+        def _on_page(page):
+            def _on_frame_navigated(frame):
+                if frame == page.main_frame:
+                    self.navigations += 1
+
+            page.on("framenavigated", _on_frame_navigated)
+
+        for page in context.pages:
+            _on_page(page)
+        context.on("page", _on_page)
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        JSON-serializable representation of the recorded metrics.
+        """
+        return {
+            "timestamp": time(),
+            "operations": [
+                {"operation": operation, "outcome": outcome, "count": count}
+                for (operation, outcome), count in self.operations.items()
+            ],
+            "latencies": {
+                operation: {
+                    "buckets": list(histogram.buckets),
+                    "bucket_counts": histogram.bucket_counts,
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                }
+                for operation, histogram in self.latencies.items()
+            },
+            "logins": self.logins,
+            "password_confirmations": self.password_confirmations,
+            "navigations": self.navigations,
+            "peak_browser_rss_bytes": self.peak_browser_rss,
+            "peak_python_rss_bytes": self.peak_python_rss,
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Representation of the recorded metrics in Prometheus' text format.
+        """
+        lines = []
+
+        def _metric(name, type_, help_, samples):
+            lines.append(f"# HELP {metric_prefix}_{name} {help_}")
+            lines.append(f"# TYPE {metric_prefix}_{name} {type_}")
+            for suffix, labels, value in samples:
+                label_str = ",".join(
+                    f'{k}="{_escape_label_value(v)}"' for k, v in labels
+                )
+                if label_str:
+                    label_str = "{" + label_str + "}"
+                lines.append(
+                    f"{metric_prefix}_{name}{suffix}{label_str} {value}"
+                )
+
+        _metric(
+            "operations_total",
+            "counter",
+            "Number of session operations by outcome.",
+            [
+                ("", [("operation", op), ("outcome", outcome)], count)
+                for (op, outcome), count in self.operations.items()
+            ],
+        )
+        latency_samples: list[tuple[str, list[tuple[str, str]], Any]] = []
+        for op, histogram in self.latencies.items():
+            for upper_bound, cumulative_count in zip(
+                histogram.buckets, histogram.cumulative_counts()
+            ):
+                latency_samples.append(
+                    (
+                        "_bucket",
+                        [("operation", op), ("le", str(upper_bound))],
+                        cumulative_count,
+                    )
+                )
+            latency_samples.append(
+                (
+                    "_bucket",
+                    [("operation", op), ("le", "+Inf")],
+                    histogram.count,
+                )
+            )
+            latency_samples.append(
+                ("_sum", [("operation", op)], histogram.sum)
+            )
+            latency_samples.append(
+                ("_count", [("operation", op)], histogram.count)
+            )
+        _metric(
+            "operation_duration_seconds",
+            "histogram",
+            "Duration of session operations.",
+            latency_samples,
+        )
+        _metric(
+            "logins_total",
+            "counter",
+            "Number of logins performed.",
+            [("", [], self.logins)],
+        )
+        _metric(
+            "password_confirmations_total",
+            "counter",
+            "Number of password confirmations performed.",
+            [("", [], self.password_confirmations)],
+        )
+        _metric(
+            "navigations_total",
+            "counter",
+            "Number of main frame navigations.",
+            [("", [], self.navigations)],
+        )
+        for name, value, help_ in [
+            (
+                "peak_browser_rss_bytes",
+                self.peak_browser_rss,
+                "Peak RSS of the browser and Playwright driver processes.",
+            ),
+            (
+                "peak_python_rss_bytes",
+                self.peak_python_rss,
+                "Peak RSS of the Python process.",
+            ),
+        ]:
+            if value is not None:
+                _metric(name, "gauge", help_, [("", [], value)])
+        _metric(
+            "last_run_timestamp_seconds",
+            "gauge",
+            "Time at which the metrics were written.",
+            [("", [], time())],
+        )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path | str, format: str | None = None):
+        """
+        Write the recorded metrics to a file.
+
+        The file is replaced atomically so that readers never see partial
+        contents.
+
+        Args:
+            path: Path of the file to write.
+            format: ``"prometheus"`` or ``"json"``. ``None`` means ``"json"``
+                for paths ending in ``.json`` and ``"prometheus"`` otherwise.
+        """
+        path = Path(path)
+        if format is None:
+            format = "json" if path.suffix.lower() == ".json" else "prometheus"
+        if format == "json":
+            content = json.dumps(self.to_dict(), indent=2)
+        elif format == "prometheus":
+            content = self.to_prometheus()
+        else:
+            raise ValueError(f"unknown metrics format: {format!r}")
+        with NamedTemporaryFile(
+            "w", dir=path.parent, prefix=f".{path.name}.", delete=False
+        ) as f:
+            f.write(content)
+        # NamedTemporaryFile creates files only readable by the owner, which
+        # would keep e.g. the node exporter from reading them
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, path)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,182 @@
+"""
+One-shot classification of the state of a PyPI page.
+"""
+from dataclasses import dataclass
+
+from dateutil.parser import isoparse
+
+from .common import (
+    AllProjects,
+    SingleProject,
+    TokenListEntry,
+    UnexpectedContentError,
+)
+
+# takes the document to read from so that it can also be used on documents
+# that were fetched in the background instead of the page's own one
+_token_table_rows_js = """
+(doc) => {
+  const section = doc.querySelector("#api-tokens");
+  if (section === null) {
+    return null;
+  }
+  // innerText falls back to the raw text content for documents that aren't
+  // rendered, so whitespace has to be normalized
+  const text = (el) => el.innerText.replace(/\\s+/g, " ").trim();
+  const datetime = (col) => {
+    const times = col.querySelectorAll("time");
+    return times.length === 1 ? times[0].getAttribute("datetime") : null;
+  };
+  return Array.from(
+    section.querySelectorAll(":scope > table > tbody > tr"),
+    (row) => {
+      const cols = row.querySelectorAll("th, td");
+      return {
+        name: text(cols[0]),
+        scope: text(cols[1]),
+        created: datetime(cols[2]),
+        last_used: datetime(cols[3]),
+      };
+    }
+  );
+}
+"""
+
+# evaluated in the page so that everything we need to know about it can be
+# found out in a single round trip
+_probe_page_state_js = """
+() => {
+  const texts = (selector) => Array.from(
+    document.querySelectorAll(selector), (el) => el.innerText.trim()
+  );
+  const userButtons = texts("#user-indicator > nav:first-child > button");
+  return {
+    url: document.location.href,
+    logged_in_user: userButtons.length === 1 ? userButtons[0] : null,
+    has_username_input: document.querySelectorAll("#username").length === 1,
+    has_password_input: document.querySelectorAll("#password").length === 1,
+    // only headings, as the text could appear anywhere else (e.g. in a token
+    // name). textContent doesn't require layout, unlike innerText
+    sudo_prompt: Array.from(
+      document.querySelectorAll("h1, h2, h3"),
+      (el) => el.textContent.toLowerCase()
+    ).some((text) => text.includes("confirm password to continue")),
+    username_errors: texts("#username-errors ul li"),
+    password_errors: texts("#password-errors ul li"),
+    has_token_table: document.querySelector("#api-tokens") !== null,
+    token_rows: (TOKEN_TABLE_ROWS)(document),
+  };
+}
+""".replace(
+    "TOKEN_TABLE_ROWS", _token_table_rows_js.strip()
+)
+
+_read_token_table_js = f"() => ({_token_table_rows_js.strip()})(document)"
+
+_fetch_token_table_js = f"""
+async (url) => {{
+  const response = await fetch(url, {{ credentials: "same-origin" }});
+  if (!response.ok || response.redirected) {{
+    return null;
+  }}
+  const doc = new DOMParser().parseFromString(
+    await response.text(), "text/html"
+  );
+  return ({_token_table_rows_js.strip()})(doc);
+}}
+"""
+
+
+@dataclass
+class PageState:
+    """
+    Structured description of what's on a PyPI page.
+    """
+
+    url: str
+    "URL of the page"
+    logged_in_user: str | None
+    "Name of the logged-in user shown in the header, if any"
+    has_username_input: bool
+    "Whether there is a username field (as found in the login form)"
+    has_password_input: bool
+    "Whether there is a password field (login form or sudo prompt)"
+    sudo_prompt: bool
+    "Whether the page asks to confirm the password before continuing"
+    username_errors: list[str]
+    "Error messages shown for the username field"
+    password_errors: list[str]
+    "Error messages shown for the password field"
+    has_token_table: bool
+    "Whether the page has an API token section (which may be empty)"
+    token_list: list[TokenListEntry] | None
+    "Tokens listed in the API token section, if there is one"
+
+
+async def probe_page_state(page) -> PageState:
+    """
+    Determine the state of a page using a single in-page evaluation.
+    """
+    state = await page.evaluate(_probe_page_state_js)
+    return PageState(
+        token_list=_parse_token_table_rows(state.pop("token_rows")), **state
+    )
+
+
+async def read_token_table(page) -> list[TokenListEntry] | None:
+    """
+    Read the table of API tokens from a page using a single evaluation.
+
+    Returns:
+        The token list entries, or ``None`` if the page has no API token
+        section at all (as opposed to an empty one).
+    """
+    return _parse_token_table_rows(await page.evaluate(_read_token_table_js))
+
+
+async def fetch_token_table(page, url: str) -> list[TokenListEntry] | None:
+    """
+    Fetch a page in the background of another one and read its table of API
+    tokens, without navigating or rendering anything.
+
+    The request is made from within ``page`` (so it must be on the same
+    origin as ``url``) with its cookies.
+
+    Returns:
+        The token list entries, or ``None`` if the response wasn't successful,
+        was redirected (e.g. to the login page) or has no API token section
+        (e.g. because PyPI asks to confirm the password first).
+    """
+    return _parse_token_table_rows(
+        await page.evaluate(_fetch_token_table_js, url)
+    )
+
+
+def _parse_token_table_rows(
+    rows: list[dict] | None,
+) -> list[TokenListEntry] | None:
+    if rows is None:
+        return None
+    entries = []
+    for row in rows:
+        if row["created"] is None:
+            raise UnexpectedContentError(
+                f"no creation time found for token {row['name']!r}"
+            )
+        entries.append(
+            TokenListEntry(
+                row["name"],
+                (
+                    AllProjects()
+                    if row["scope"] == "All projects"
+                    else SingleProject(row["scope"])
+                ),
+                isoparse(row["created"]),
+                (
+                    isoparse(row["last_used"])
+                    if row["last_used"] is not None
+                    else None
+                ),
+            )
+        )
+    return entries
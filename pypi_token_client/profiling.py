@@ -0,0 +1,98 @@
+"""
+Per-operation Playwright tracing and Python profiling.
+"""
+from contextlib import asynccontextmanager
+from cProfile import Profile
+from datetime import datetime
+from logging import Logger, getLogger
+from pathlib import Path
+from time import perf_counter
+from typing import AsyncIterator
+
+default_logger = getLogger(__name__)
+
+
+class OperationProfiler:
+    """
+    Captures profiling artifacts for each operation of a session.
+
+    For each operation, a Playwright trace (screenshots, DOM snapshots and
+    network activity; can be viewed with ``playwright show-trace``) and
+    optionally a Python profile (can be loaded with :mod:`pstats`) are
+    recorded. Artifacts are only written for operations that took at least
+    ``threshold`` seconds, so that profiling can stay enabled permanently
+    while only keeping data about slow operations.
+
+    Artifacts are named ``<operation>-<timestamp>.trace.zip`` and
+    ``<operation>-<timestamp>.pstats``, respectively.
+
+    Args:
+        directory: Directory to write artifacts to. Will be created if it
+            doesn't exist.
+        threshold: Minimum duration of an operation in seconds for its
+            artifacts to be kept.
+        python_profile: Whether to profile the Python side using
+            :mod:`cProfile` in addition to tracing.
+        logger: Logger to log messages to.
+    """
+
+    def __init__(
+        self,
+        directory: Path | str,
+        threshold: float = 0.0,
+        python_profile: bool = False,
+        logger: Logger = default_logger,
+    ):
+        self.directory = Path(directory)
+        self.threshold = threshold
+        self.python_profile = python_profile
+        self.logger = logger
+
+    async def start(self, context):
+        """
+        Start tracing on a browser context.
+
+        Must be called for each context before it can be profiled.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        await context.tracing.start(screenshots=True, snapshots=True)
+
+    @asynccontextmanager
+    async def profile(self, context, operation: str) -> AsyncIterator[None]:
+        """
+        Context manager profiling the operation performed inside it.
+
+        Args:
+            context: Browser context the operation is performed in.
+            operation: Name of the operation, used in artifact file names.
+        """
+        timestamp = datetime.now().strftime("%Y%m%dT%H%M%S.%f")
+        await context.tracing.start_chunk(title=operation)
+        profile: Profile | None = None
+        if self.python_profile:
+            profile = Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                # only one profiler can be active per thread on newer Pythons
+                self.logger.warning(f"not profiling {operation}: {e}")
+                profile = None
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            duration = perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            if duration >= self.threshold:
+                stem = f"{operation}-{timestamp}"
+                trace_path = self.directory / f"{stem}.trace.zip"
+                await context.tracing.stop_chunk(path=trace_path)
+                if profile is not None:
+                    profile.dump_stats(self.directory / f"{stem}.pstats")
+                self.logger.info(
+                    f"{operation} took {duration:.3f}s, profiling artifacts "
+                    f"saved as {self.directory / stem}.*"
+                )
+            else:
+                await context.tracing.stop_chunk()
@@ -0,0 +1,47 @@
+"""
+Loading of structured data files.
+"""
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+
+def load_data_file(path: Path | str) -> Any:
+    """
+    Load data from a TOML, YAML or JSON file.
+
+    The format is determined from the file extension.
+
+    Raises:
+        ValueError: If the file type is unsupported, support for it is
+            missing or the file can't be parsed.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".toml":
+        with path.open("rb") as f:
+            return tomllib.load(f)
+    elif suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ValueError(
+                "reading YAML files requires PyYAML, which can be installed "
+                "using the 'yaml' extra"
+            ) from e
+        with path.open() as f:
+            try:
+                return yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"invalid YAML: {e}") from e
+    elif suffix == ".json":
+        with path.open() as f:
+            return json.load(f)
+    else:
+        raise ValueError(f"unsupported file type: {path.suffix!r}")
@@ -0,0 +1,161 @@
+"""
+Utilities for HTTP Archive (HAR) files recorded by Playwright.
+"""
+import json
+import re
+from base64 import b64decode, b64encode
+from pathlib import Path
+from typing import Any, Iterable
+from urllib.parse import quote, quote_plus, urldefrag
+
+redacted = "REDACTED"
+_pypi_token_re = re.compile(r"pypi-[A-Za-z0-9_\-]{16,}")
+_secret_headers = {"cookie", "set-cookie", "authorization"}
+
+
+def _scrub_str(s: str, secrets: Iterable[str]) -> str:
+    for secret in secrets:
+        s = s.replace(secret, redacted)
+    return _pypi_token_re.sub(f"pypi-{redacted}", s)
+
+
+def _scrub_text_field(obj: dict[str, Any], secrets: Iterable[str]):
+    text = obj.get("text")
+    if not isinstance(text, str):
+        return
+    if obj.get("encoding") == "base64":
+        try:
+            decoded = b64decode(text).decode("utf-8")
+        except UnicodeDecodeError:
+            # binary content can't contain anything we care about
+            return
+        obj["text"] = b64encode(
+            _scrub_str(decoded, secrets).encode("utf-8")
+        ).decode("ascii")
+    else:
+        obj["text"] = _scrub_str(text, secrets)
+
+
+def _scrub_message(message: dict[str, Any], secrets: Iterable[str]):
+    for header in message.get("headers", []):
+        if header.get("name", "").lower() in _secret_headers:
+            header["value"] = redacted
+        else:
+            header["value"] = _scrub_str(header.get("value", ""), secrets)
+    for cookie in message.get("cookies", []):
+        cookie["value"] = redacted
+    if "url" in message:
+        message["url"] = _scrub_str(message["url"], secrets)
+    if "postData" in message:
+        post_data = message["postData"]
+        _scrub_text_field(post_data, secrets)
+        for param in post_data.get("params", []):
+            if "value" in param:
+                param["value"] = _scrub_str(param["value"], secrets)
+    if "content" in message:
+        _scrub_text_field(message["content"], secrets)
+
+
+def scrub_har(path: Path | str, secrets: Iterable[str]) -> None:
+    """
+    Remove secrets from a HAR file in-place.
+
+    Scrubbed are: All occurrences of the given secrets (as-is and URL-encoded)
+    in URLs, headers, request bodies and response bodies, anything that looks
+    like a PyPI token, and all cookie / authorization header values.
+
+    Args:
+        path: Path to the HAR file.
+        secrets: Strings (e.g. passwords) to scrub.
+    """
+    secret_variants = set()
+    for secret in secrets:
+        if not secret:
+            continue
+        secret_variants |= {secret, quote(secret, safe=""), quote_plus(secret)}
+    # replace longest ones first so that no partial matches remain
+    sorted_secrets = sorted(secret_variants, key=len, reverse=True)
+    path = Path(path)
+    har = json.loads(path.read_text())
+    for entry in har.get("log", {}).get("entries", []):
+        _scrub_message(entry.get("request", {}), sorted_secrets)
+        _scrub_message(entry.get("response", {}), sorted_secrets)
+    path.write_text(json.dumps(har))
+
+
+# set by the browser itself when fulfilling, or wrong for the decoded body
+_skipped_replay_headers = {
+    "content-length",
+    "content-encoding",
+    "transfer-encoding",
+}
+
+
+class HarReplayer:
+    """
+    Serves responses recorded in a HAR file to a Playwright browser context.
+
+    Unlike Playwright's own ``route_from_har``, requests are matched by
+    method and URL only, not by their bodies, which would no longer match
+    once secrets have been scrubbed from them (see :func:`scrub_har`).
+    Requests matching several recorded entries are served these entries in
+    the order they were recorded (the last one being repeated once they have
+    all been served), so that e.g. the account page looks different before
+    and after deleting a token, as it did while recording. Requests that
+    weren't recorded at all are aborted.
+
+    Args:
+        path: Path to the HAR file.
+    """
+
+    def __init__(self, path: Path | str):
+        har = json.loads(Path(path).read_text())
+        self._entries: dict[tuple[str, str], list[dict[str, Any]]] = {}
+        for entry in har.get("log", {}).get("entries", []):
+            request = entry.get("request", {})
+            key = (request.get("method", "GET"), urldefrag(request["url"])[0])
+            self._entries.setdefault(key, []).append(entry)
+        self._served: dict[tuple[str, str], int] = {}
+
+    def find(self, method: str, url: str) -> dict[str, Any] | None:
+        """
+        Get the recorded response to serve for a request.
+
+        Returns:
+            The HAR response object, or ``None`` if no matching request was
+            recorded.
+        """
+        key = (method, urldefrag(url)[0])
+        entries = self._entries.get(key)
+        if not entries:
+            return None
+        served = self._served.get(key, 0)
+        self._served[key] = served + 1
+        return entries[min(served, len(entries) - 1)]["response"]
+
+    async def attach(self, context) -> None:
+        """
+        Start serving responses to all requests made in a browser context.
+        """
+        await context.route("**/*", self._handle)
+
+    async def _handle(self, route) -> None:
+        response = self.find(route.request.method, route.request.url)
+        if response is None:
+            await route.abort()
+            return
+        content = response.get("content", {})
+        text = content.get("text", "")
+        body = (
+            b64decode(text)
+            if content.get("encoding") == "base64"
+            else text.encode("utf-8")
+        )
+        headers = {
+            header["name"]: header["value"]
+            for header in response.get("headers", [])
+            if header["name"].lower() not in _skipped_replay_headers
+        }
+        await route.fulfill(
+            status=response.get("status", 200), headers=headers, body=body
+        )
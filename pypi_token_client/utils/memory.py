@@ -0,0 +1,84 @@
+"""
+Process memory introspection via ``/proc``.
+
+Only works on Linux (or other systems providing a compatible ``/proc``); all
+functions return ``None`` where that information is unavailable.
+"""
+import os
+from pathlib import Path
+
+_proc = Path("/proc")
+
+
+def get_rss(pid: int | None = None) -> int | None:
+    """
+    Get the resident set size (RSS) of a process in bytes.
+
+    Args:
+        pid: ID of the process. ``None`` means the current process.
+    """
+    status_path = _proc / ("self" if pid is None else str(pid)) / "status"
+    try:
+        status = status_path.read_text()
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("VmRSS:"):
+            # format is "VmRSS:     1234 kB"
+            return int(line.split()[1]) * 1024
+    # kernel threads & zombies have no VmRSS
+    return 0
+
+
+def get_descendant_pids(pid: int | None = None) -> list[int]:
+    """
+    Get the IDs of all (direct and indirect) child processes of a process.
+
+    Args:
+        pid: ID of the process. ``None`` means the current process.
+    """
+    root_pid = os.getpid() if pid is None else pid
+    children_by_parent: dict[int, list[int]] = {}
+    try:
+        proc_entries = list(_proc.iterdir())
+    except OSError:
+        return []
+    for entry in proc_entries:
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # the process name in parentheses may contain spaces, so split after
+        # its closing parenthesis; the parent PID is the 2nd field after it
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children_by_parent.setdefault(ppid, []).append(int(entry.name))
+    descendants = []
+    to_visit = [root_pid]
+    while to_visit:
+        children = children_by_parent.get(to_visit.pop(), [])
+        descendants.extend(children)
+        to_visit.extend(children)
+    return descendants
+
+
+def get_descendants_rss(pid: int | None = None) -> int | None:
+    """
+    Get the summed RSS in bytes of all child processes of a process.
+
+    For the current process, this includes the Playwright driver and any
+    browser processes launched through it (but not those of browsers that
+    were merely connected to).
+
+    Args:
+        pid: ID of the process. ``None`` means the current process.
+    """
+    if not _proc.is_dir():
+        return None
+    total = 0
+    for descendant_pid in get_descendant_pids(pid):
+        rss = get_rss(descendant_pid)
+        if rss is not None:
+            total += rss
+    return total
@@ -1,10 +1,49 @@
-async def launch_ephemeral_chromium_context(p, headless: bool = True):
+async def launch_ephemeral_chromium_context(
+    p, headless: bool = True, **context_options
+):
     """
     Ephemeral version of Playwright's chromium.launch_persistent_context.
 
     No idea why they didn't just include that themselves...
+
+    Unlike the persistent version, this returns the launched browser in
+    addition to the context, as closing the context alone won't close the
+    browser.
+
+    Extra keyword arguments are passed on to ``browser.new_context``.
+
+    Returns:
+        Tuple of the browser and the context.
     """
     browser = await p.chromium.launch(headless=headless)
-    context = await browser.new_context()
+    context = await browser.new_context(**context_options)
+    await context.new_page()
+    return browser, context
+
+
+async def connect_to_chromium_context(p, endpoint: str, **context_options):
+    """
+    Open a new ephemeral context in an already-running Chromium instance.
+
+    Endpoints pointing to a Chrome DevTools Protocol (CDP) server (``http://``
+    / ``https://`` URLs or ``ws://`` URLs with a ``/devtools/browser/`` path)
+    are connected to via CDP, all other ones are assumed to be Playwright
+    browser servers (as started by e.g. ``playwright run-server``).
+
+    Closing the returned browser only disconnects from it and closes the
+    contexts opened by us, the browser itself keeps running.
+
+    Extra keyword arguments are passed on to ``browser.new_context``.
+
+    Returns:
+        Tuple of the (connected) browser and the context.
+    """
+    if endpoint.startswith(("http://", "https://")) or (
+        "/devtools/browser/" in endpoint
+    ):
+        browser = await p.chromium.connect_over_cdp(endpoint)
+    else:
+        browser = await p.chromium.connect(endpoint)
+    context = await browser.new_context(**context_options)
     await context.new_page()
-    return context
+    return browser, context
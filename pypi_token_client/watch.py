@@ -0,0 +1,106 @@
+"""
+Watching an account's token list for changes.
+"""
+import asyncio
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from logging import getLogger
+from time import monotonic
+from typing import Any, Sequence
+
+from .common import LoginError, TokenListEntry
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class TokenChange:
+    kind: str
+    "``added``, ``removed`` or ``changed``"
+    token: TokenListEntry
+    "The token as it is now (or was before it was removed)"
+    previous: TokenListEntry | None = None
+    "The token as it was before (``changed`` only)"
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Machine-readable (JSON-serializable) representation of the change.
+        """
+        d: dict[str, Any] = {"event": self.kind, "token": self.token.to_dict()}
+        if self.previous is not None:
+            d["previous"] = self.previous.to_dict()
+        return d
+
+
+def diff_token_lists(
+    old: Sequence[TokenListEntry], new: Sequence[TokenListEntry]
+) -> list[TokenChange]:
+    """
+    Determine how a token list has changed, keyed on token names.
+
+    Removals come first, then additions and changes in the order of ``new``.
+    """
+    old_by_name = {t.name: t for t in old}
+    new_names = {t.name for t in new}
+    changes = [
+        TokenChange("removed", t) for t in old if t.name not in new_names
+    ]
+    for token in new:
+        previous = old_by_name.get(token.name)
+        if previous is None:
+            changes.append(TokenChange("added", token))
+        elif previous != token:
+            changes.append(TokenChange("changed", token, previous))
+    return changes
+
+
+async def watch_token_list(
+    session,
+    interval: float,
+    emit_initial: bool = False,
+    timeout: float | None = None,
+) -> AsyncIterator[tuple[datetime, list[TokenChange]]]:
+    """
+    Poll a session's token list and yield changes to it.
+
+    Polls using the session's ``refresh_token_list`` method, so after the
+    first poll, usually only the account page's HTML is fetched.
+    Polls that fail (e.g. due to timeouts or network errors) are logged and
+    skipped, except for login failures.
+
+    Args:
+        session: :class:`~pypi_token_client.AsyncPypiTokenClientSession` to
+            poll with.
+        interval: Seconds between the starts of consecutive polls.
+        emit_initial: Whether to report all tokens found by the first poll as
+            added. Otherwise, the first poll only serves as the baseline.
+        timeout: Deadline in seconds for each individual poll. ``None`` means
+            no deadline.
+
+    Returns:
+        Async iterator over the time of each poll that found changes (in UTC)
+        together with the changes. Never ends by itself.
+    """
+    previous: Sequence[TokenListEntry] | None = None
+    next_poll = monotonic()
+    while True:
+        await asyncio.sleep(max(next_poll - monotonic(), 0))
+        next_poll = monotonic() + interval
+        try:
+            current = await session.refresh_token_list(timeout=timeout)
+        except LoginError:
+            # not going to fix itself
+            raise
+        except Exception as e:
+            # e.g. timeouts or network errors, which are usually transient
+            logger.warning(f"skipping poll: {type(e).__name__}: {e}")
+            continue
+        polled_at = datetime.now(timezone.utc)
+        if previous is None and not emit_initial:
+            previous = current
+            continue
+        changes = diff_token_lists(previous or [], current)
+        previous = current
+        if changes:
+            yield polled_at, changes
@@ -2,6 +2,8 @@ import sys
 
 import pytest
 
+from pypi_token_client import AsyncPypiTokenClientSession, PypiCredentials
+
 
 class TeeCapSysWrapper:
     def __init__(self, capsys):
@@ -20,3 +22,64 @@ class TeeCapSysWrapper:
 @pytest.fixture
 def tee_capsys(capsys):
     return TeeCapSysWrapper(capsys)
+
+
+class FakePage:
+    """
+    Stand-in for a Playwright page, for testing sessions without a browser.
+
+    Navigating awaits the given coroutine function, or fails if there is none
+    (e.g. because operations shouldn't get to operate on the page).
+    """
+
+    def __init__(self, goto=None):
+        self._goto = goto
+        self.closed = False
+        self.url = "about:blank"
+
+    def set_default_timeout(self, timeout):
+        pass
+
+    async def goto(self, url, **kwargs):
+        if self._goto is None:
+            raise AssertionError(f"unexpected navigation to {url}")
+        await self._goto()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    """
+    Stand-in for a Playwright browser context creating :class:`FakePage`\\ s.
+
+    Has no ``storage_state`` etc., so replacing it fails loudly.
+    """
+
+    def __init__(self, goto=None):
+        self.goto = goto
+        self.pages = []
+
+    async def new_page(self):
+        page = FakePage(self.goto)
+        self.pages.append(page)
+        return page
+
+
+@pytest.fixture
+def make_session():
+    """
+    Factory for sessions on a :class:`FakePage` in a :class:`FakeContext`,
+    both navigating with the given ``goto`` (other arguments are passed on to
+    the session).
+    """
+
+    def _make_session(goto=None, **kwargs):
+        return AsyncPypiTokenClientSession(
+            FakeContext(goto),
+            FakePage(goto),
+            PypiCredentials("user", "password"),
+            **kwargs,
+        )
+
+    return _make_session
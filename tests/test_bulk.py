@@ -0,0 +1,130 @@
+import signal
+from pathlib import Path
+
+import pytest
+
+from pypi_token_client.app import App
+from pypi_token_client.bulk import (
+    BulkJobError,
+    load_bulk_operations,
+    parse_bulk_operations,
+    run_bulk_operations,
+    shard_operations,
+)
+from pypi_token_client.common import AllProjects, SingleProject
+
+
+def test_load_bulk_operations_toml(tmp_path):
+    path = tmp_path / "job.toml"
+    path.write_text(
+        "[[operations]]\n"
+        'username = "alice"\n'
+        'action = "create"\n'
+        'name = "ci"\n'
+        'project = "myproject"\n'
+        "[[operations]]\n"
+        'base_url = "https://test.pypi.org"\n'
+        'username = "bob"\n'
+        'action = "list"\n'
+    )
+    first, second = load_bulk_operations(path)
+    assert (first.base_url, first.username, first.action) == (
+        "https://pypi.org",
+        "alice",
+        "create",
+    )
+    assert first.scope == SingleProject("myproject")
+    assert (second.index, second.base_url, second.scope) == (
+        1,
+        "https://test.pypi.org",
+        AllProjects(),
+    )
+
+
+def test_parse_bulk_operations_requires_name():
+    with pytest.raises(BulkJobError):
+        parse_bulk_operations(
+            {"operations": [{"username": "alice", "action": "delete"}]}
+        )
+
+
+def test_shard_operations_keeps_order_within_shards():
+    operations = parse_bulk_operations(
+        {
+            "operations": [
+                {"username": "alice", "action": "list"},
+                {"username": "bob", "action": "list"},
+                {"username": "alice", "action": "delete", "name": "a"},
+                {
+                    "username": "alice",
+                    "action": "list",
+                    "base_url": "https://test.pypi.org",
+                },
+            ]
+        }
+    )
+    shards = shard_operations(operations)
+    assert [[op.index for op in shard] for shard in shards] == [
+        [0, 2],
+        [1],
+        [3],
+    ]
+
+
+def test_run_bulk_operations_yields_results_in_order():
+    # the password variables aren't set, so this only exercises the
+    # distribution over worker processes without launching any browsers
+    operations = parse_bulk_operations(
+        {
+            "operations": [
+                {
+                    "username": f"user{i % 3}",
+                    "action": "list",
+                    "password_env": "PYPITOKENCLIENT_TEST_UNSET_PASSWORD",
+                }
+                for i in range(7)
+            ]
+        }
+    )
+    results = list(run_bulk_operations(operations, workers=2))
+    assert [r.operation.index for r in results] == list(range(7))
+    assert all(r.status == "error" for r in results)
+    assert (
+        "PYPITOKENCLIENT_TEST_UNSET_PASSWORD" in results[0].to_dict()["error"]
+    )
+
+
+def test_run_bulk_operations_restores_signal_handlers():
+    operations = parse_bulk_operations(
+        {
+            "operations": [
+                {
+                    "username": "user",
+                    "action": "list",
+                    "password_env": "PYPITOKENCLIENT_TEST_UNSET_PASSWORD",
+                }
+            ]
+        }
+    )
+    handlers_before = signal.getsignal(signal.SIGINT), signal.getsignal(
+        signal.SIGTERM
+    )
+    list(run_bulk_operations(operations, workers=1))
+    assert (
+        signal.getsignal(signal.SIGINT),
+        signal.getsignal(signal.SIGTERM),
+    ) == handlers_before
+
+
+@pytest.mark.parametrize(
+    "option, kwargs",
+    [
+        ("--metrics-file", {"metrics_file": Path("metrics.prom")}),
+        ("--username", {"username": "user"}),
+        ("--password", {"password": "password"}),
+    ],
+)
+def test_bulk_rejects_unsupported_options(tmp_path, option, kwargs):
+    app = App(**kwargs)
+    with pytest.raises(BulkJobError, match=option):
+        app.bulk(tmp_path / "job.toml")
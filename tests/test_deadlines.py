@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import pytest
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from pypi_token_client import OperationTimeoutError
+from pypi_token_client.metrics import MetricsRecorder
+
+
+async def _hang():
+    await asyncio.sleep(3600)
+
+
+async def _time_out_at_deadline():
+    # like a Playwright wait capped to the time remaining until the deadline,
+    # which fails right before our own deadline is enforced (blocking so that
+    # the event loop can't enforce it in between)
+    time.sleep(0.06)
+    raise PlaywrightTimeoutError("Timeout 50ms exceeded.")
+
+
+@pytest.mark.parametrize("goto", [_hang, _time_out_at_deadline])
+def test_timed_out_operation_replaces_page(make_session, goto):
+    session = make_session(goto)
+    page = session.page
+
+    async def _run():
+        with pytest.raises(OperationTimeoutError):
+            await session.get_token_list(timeout=0.05)
+        # the next operation starts on a fresh page
+        with pytest.raises(OperationTimeoutError):
+            await session.get_token_list(timeout=0.05)
+
+    asyncio.run(_run())
+    assert page.closed
+    assert session.page is not page
+
+
+def test_playwright_timeout_before_deadline_is_not_converted(make_session):
+    session = make_session(_time_out_at_deadline)
+    page = session.page
+    with pytest.raises(PlaywrightTimeoutError):
+        asyncio.run(session.get_token_list(timeout=10))
+    assert session.page is page
+
+
+def test_cancelled_operation_replaces_page(make_session):
+    session = make_session(_hang)
+    page = session.page
+
+    async def _run():
+        task = asyncio.ensure_future(session.get_token_list())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        session.context.goto = _time_out_at_deadline
+        with pytest.raises(PlaywrightTimeoutError):
+            await session.get_token_list()
+
+    asyncio.run(_run())
+    assert page.closed
+    assert session.page is not page
+
+
+def test_timed_out_operation_is_recorded_as_timeout(make_session):
+    session = make_session(_time_out_at_deadline)
+    session.metrics = MetricsRecorder()
+    with pytest.raises(OperationTimeoutError):
+        asyncio.run(session.get_token_list(timeout=0.05))
+    assert session.metrics.operations == {
+        ("get_token_list", "OperationTimeoutError"): 1
+    }
@@ -0,0 +1,126 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+
+from pypi_token_client.common import AllProjects, SingleProject, TokenListEntry
+from pypi_token_client.desired_state import (
+    DesiredStateError,
+    DesiredToken,
+    PartialApplyError,
+    apply_plan,
+    load_desired_tokens,
+    make_plan,
+    parse_desired_tokens,
+)
+
+
+def _entry(name, scope):
+    return TokenListEntry(name, scope, datetime(2023, 1, 1), None)
+
+
+def test_load_desired_tokens_toml(tmp_path):
+    path = tmp_path / "tokens.toml"
+    path.write_text(
+        "[[tokens]]\n"
+        'name = "ci"\n'
+        'project = "myproject"\n'
+        "[[tokens]]\n"
+        'name = "all"\n'
+    )
+    assert load_desired_tokens(path) == [
+        DesiredToken("ci", SingleProject("myproject")),
+        DesiredToken("all", AllProjects()),
+    ]
+
+
+def test_parse_desired_tokens_rejects_duplicates():
+    with pytest.raises(DesiredStateError):
+        parse_desired_tokens({"tokens": [{"name": "a"}, {"name": "a"}]})
+
+
+def test_make_plan():
+    desired = [
+        DesiredToken("keep", SingleProject("p")),
+        DesiredToken("rescope", SingleProject("p")),
+        DesiredToken("new", AllProjects()),
+    ]
+    current = [
+        _entry("keep", SingleProject("p")),
+        _entry("rescope", AllProjects()),
+        _entry("extra", AllProjects()),
+    ]
+    plan = make_plan(desired, current)
+    assert [c.token.name for c in plan.creations] == ["rescope", "new"]
+    assert [d.token.name for d in plan.deletions] == ["rescope"]
+    assert [u.name for u in plan.unchanged] == ["keep"]
+    pruning_plan = make_plan(desired, current, prune=True)
+    assert [d.token.name for d in pruning_plan.deletions] == [
+        "rescope",
+        "extra",
+    ]
+    assert pruning_plan.to_dict()["delete"][1] == {
+        "name": "extra",
+        "project": None,
+        "reason": "undesired",
+    }
+
+
+def test_make_plan_without_changes():
+    desired = [DesiredToken("keep", AllProjects())]
+    plan = make_plan(desired, [_entry("keep", AllProjects())])
+    assert not plan.has_changes
+
+
+class _FakeSession:
+    def __init__(self, failing_names=()):
+        self.failing_names = set(failing_names)
+        self.deleted = []
+        self.created = []
+
+    async def validate_scopes(self, scopes, *, timeout=None):
+        pass
+
+    @asynccontextmanager
+    async def fork_many(self, n):
+        yield [self] * n
+
+    async def delete_token(self, name, *, timeout=None):
+        if name in self.failing_names:
+            raise RuntimeError("deletion failed")
+        self.deleted.append(name)
+
+    async def create_token(self, name, scope, *, timeout=None):
+        if name in self.failing_names:
+            raise RuntimeError("creation failed")
+        self.created.append(name)
+        return f"pypi-{name}"
+
+
+def test_apply_plan_keeps_created_tokens_on_failure():
+    desired = [DesiredToken(name, AllProjects()) for name in ("a", "b", "c")]
+    plan = make_plan(desired, [])
+    reported = {}
+    with pytest.raises(PartialApplyError) as exc_info:
+        asyncio.run(
+            apply_plan(
+                _FakeSession(failing_names=["b"]),
+                plan,
+                concurrency=2,
+                on_created=reported.__setitem__,
+            )
+        )
+    assert exc_info.value.created == {"a": "pypi-a", "c": "pypi-c"}
+    assert reported == exc_info.value.created
+    assert list(exc_info.value.failures) == ["b"]
+
+
+def test_apply_plan_creates_nothing_if_deletion_fails():
+    desired = [DesiredToken("a", AllProjects())]
+    session = _FakeSession(failing_names=["x"])
+    plan = make_plan(desired, [_entry("x", AllProjects())], prune=True)
+    with pytest.raises(PartialApplyError) as exc_info:
+        asyncio.run(apply_plan(session, plan))
+    assert list(exc_info.value.failures) == ["x"]
+    assert session.created == []
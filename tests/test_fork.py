@@ -0,0 +1,19 @@
+import asyncio
+
+
+def test_context_is_not_replaced_while_forks_are_alive(make_session):
+    session = make_session(browser=object(), recycle_context=True)
+    context, page = session.context, session.page
+
+    async def _run():
+        async with session.fork_many(2) as (_, forked):
+            await session._recycle()
+            assert not forked.page.closed
+        return forked
+
+    forked = asyncio.run(_run())
+    assert session.context is context
+    assert page.closed
+    assert session.page is not page
+    assert forked.page.closed
+    assert session._live_forks == 0
@@ -0,0 +1,137 @@
+import asyncio
+import json
+from base64 import b64decode, b64encode
+from types import SimpleNamespace
+
+from pypi_token_client import PypiCredentials
+from pypi_token_client.utils.har import HarReplayer, scrub_har
+
+
+def _make_har(password: str, token: str) -> dict:
+    return {
+        "log": {
+            "entries": [
+                {
+                    "request": {
+                        "method": "POST",
+                        "url": "https://pypi.org/account/login/",
+                        "headers": [{"name": "Cookie", "value": "session=x"}],
+                        "cookies": [{"name": "session", "value": "x"}],
+                        "postData": {
+                            "mimeType": "application/x-www-form-urlencoded",
+                            "text": f"username=me&password={password}",
+                            "params": [
+                                {"name": "password", "value": password}
+                            ],
+                        },
+                    },
+                    "response": {
+                        "status": 303,
+                        "headers": [
+                            {"name": "Location", "value": "/manage/account/"},
+                            {"name": "Content-Length", "value": "42"},
+                        ],
+                        "cookies": [],
+                        "content": {"text": f"<code>{token}</code>"},
+                    },
+                },
+                {
+                    "request": {"url": "https://pypi.org/", "headers": []},
+                    "response": {
+                        "headers": [],
+                        "content": {
+                            "text": b64encode(token.encode()).decode(),
+                            "encoding": "base64",
+                        },
+                    },
+                },
+            ]
+        }
+    }
+
+
+def test_scrub_har(tmp_path):
+    password = "s3cret pass&word"
+    token = "pypi-AgEIcHlwaS5vcmcCJGFiY2RlZmdoaWprbG1u"
+    path = tmp_path / "session.har"
+    path.write_text(json.dumps(_make_har(password, token)))
+    scrub_har(path, [password])
+    scrubbed = path.read_text()
+    assert password not in scrubbed
+    assert "s3cret+pass%26word" not in scrubbed
+    assert token not in scrubbed
+    assert "session=x" not in scrubbed
+    har = json.loads(scrubbed)
+    b64_content = har["log"]["entries"][1]["response"]["content"]["text"]
+    assert token not in b64decode(b64_content).decode()
+
+
+class _FakeRoute:
+    def __init__(self, method, url):
+        self.request = SimpleNamespace(method=method, url=url)
+        self.fulfilled = None
+        self.aborted = False
+
+    async def fulfill(self, **kwargs):
+        self.fulfilled = kwargs
+
+    async def abort(self):
+        self.aborted = True
+
+
+def _replay(replayer, method, url):
+    route = _FakeRoute(method, url)
+    asyncio.run(replayer._handle(route))
+    return route
+
+
+def test_scrubbed_har_round_trip(tmp_path):
+    password = "s3cret pass&word"
+    token = "pypi-AgEIcHlwaS5vcmcCJGFiY2RlZmdoaWprbG1u"
+    path = tmp_path / "session.har"
+    path.write_text(json.dumps(_make_har(password, token)))
+    scrub_har(path, [password])
+    replayer = HarReplayer(path)
+    # the body (containing the actual password) differs from the scrubbed one
+    login = _replay(replayer, "POST", "https://pypi.org/account/login/")
+    assert login.fulfilled is not None
+    assert login.fulfilled["status"] == 303
+    assert login.fulfilled["headers"] == {"Location": "/manage/account/"}
+    index = _replay(replayer, "GET", "https://pypi.org/#fragment")
+    assert b"pypi-REDACTED" in index.fulfilled["body"]
+    assert _replay(replayer, "GET", "https://pypi.org/other/").aborted
+    assert _replay(replayer, "GET", "https://pypi.org/account/login/").aborted
+
+
+def test_har_replayer_serves_repeated_requests_in_order(tmp_path):
+    url = "https://pypi.org/manage/account/"
+    path = tmp_path / "session.har"
+    path.write_text(
+        json.dumps(
+            {
+                "log": {
+                    "entries": [
+                        {
+                            "request": {"method": "GET", "url": url},
+                            "response": {"content": {"text": text}},
+                        }
+                        for text in ("before", "after")
+                    ]
+                }
+            }
+        )
+    )
+    replayer = HarReplayer(path)
+    bodies = [_replay(replayer, "GET", url).fulfilled["body"] for _ in "abc"]
+    assert bodies == [b"before", b"after", b"after"]
+
+
+def test_all_passwords_of_a_session_are_scrubbed(make_session, tmp_path):
+    session = make_session()
+    # e.g. re-prompted after a failed login
+    session.credentials = PypiCredentials("user", "right password")
+    path = tmp_path / "session.har"
+    path.write_text(json.dumps(_make_har("right password", "")))
+    scrub_har(path, session.used_passwords)
+    assert session.used_passwords == {"password", "right password"}
+    assert "right password" not in path.read_text()
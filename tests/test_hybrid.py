@@ -0,0 +1,146 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from pypi_token_client import AllProjects, SingleProject, TokenListEntry
+from pypi_token_client.common import UnexpectedContentError
+from pypi_token_client.fetched_page import FetchedForm, FetchedPage
+
+
+def _fetched(url, status=200, forms=(), **kwargs):
+    defaults = dict(
+        scope_options=[],
+        provisioned_key=None,
+        token_name_errors=[],
+        has_token_section=False,
+        token_list=None,
+        body_text="",
+    )
+    return FetchedPage(url, status, list(forms), **{**defaults, **kwargs})
+
+
+def _hybrid_session(make_session, responses):
+    # falling back to operating on the page fails, as it can't navigate
+    session = make_session(base_url="https://pypi.example", hybrid=True)
+    session._known_logged_in = True
+    requests = []
+
+    async def _fetch(url, **kwargs):
+        requests.append((kwargs.get("method", "GET"), url))
+        return responses.pop(0)
+
+    session._fetch = _fetch  # type: ignore[method-assign]
+    return session, requests
+
+
+def test_create_is_not_resubmitted_after_unexpected_response(make_session):
+    token_url = "https://pypi.example/manage/account/token/"
+    form = FetchedForm(
+        token_url,
+        "POST",
+        {"csrf_token": "x"},
+        ["description", "token_scope"],
+        None,
+        None,
+    )
+    session, requests = _hybrid_session(
+        make_session,
+        [
+            _fetched(
+                token_url,
+                forms=[form],
+                scope_options=["scope:user", "scope:project:p"],
+            ),
+            _fetched(token_url, status=502),
+        ],
+    )
+    with pytest.raises(UnexpectedContentError):
+        asyncio.run(session.create_token("t", SingleProject("p")))
+    assert [method for method, _ in requests] == ["GET", "POST"]
+
+
+def test_delete_is_not_resubmitted_after_unexpected_response(make_session):
+    account_url = "https://pypi.example/manage/account/"
+    form = FetchedForm(
+        account_url,
+        "POST",
+        {"csrf_token": "x", "macaroon_id": "1"},
+        [],
+        "confirm_password",
+        "t",
+    )
+    session, requests = _hybrid_session(
+        make_session,
+        [
+            _fetched(account_url, forms=[form], has_token_section=True),
+            _fetched(account_url, body_text="Something went wrong"),
+        ],
+    )
+    with pytest.raises(UnexpectedContentError):
+        asyncio.run(session.delete_token("t"))
+    assert [method for method, _ in requests] == ["GET", "POST"]
+
+
+def test_delete_falls_back_if_listed_token_has_no_form(make_session):
+    account_url = "https://pypi.example/manage/account/"
+    listed = TokenListEntry("t", AllProjects(), datetime(2023, 1, 1), None)
+    session, requests = _hybrid_session(
+        make_session,
+        [
+            _fetched(
+                account_url,
+                # e.g. a removal form in a modal outside of the table row
+                forms=[
+                    FetchedForm(
+                        account_url,
+                        "POST",
+                        {"csrf_token": "x", "macaroon_id": "1"},
+                        [],
+                        "confirm_password",
+                        None,
+                    )
+                ],
+                has_token_section=True,
+                token_list=[listed],
+            ),
+        ],
+    )
+    assert asyncio.run(session._delete_token_via_http("t")) is False
+    assert [method for method, _ in requests] == ["GET"]
+    assert session._token_snapshot is None
+
+
+def test_delete_updates_snapshot(make_session):
+    account_url = "https://pypi.example/manage/account/"
+    form = FetchedForm(
+        account_url,
+        "POST",
+        {"csrf_token": "x", "macaroon_id": "1"},
+        [],
+        "confirm_password",
+        "t",
+    )
+    after = [
+        TokenListEntry("a", AllProjects(), datetime(2023, 1, 1), None),
+        TokenListEntry("external", AllProjects(), datetime(2023, 1, 2), None),
+    ]
+    session, requests = _hybrid_session(
+        make_session,
+        [
+            _fetched(account_url, forms=[form], has_token_section=True),
+            _fetched(
+                account_url,
+                has_token_section=True,
+                token_list=after,
+                body_text="Deleted API token t.",
+            ),
+        ],
+    )
+
+    async def _run():
+        await session.delete_token("t")
+        return await session.get_token_list(use_cache=True)
+
+    assert asyncio.run(_run()) == after
+    assert [method for method, _ in requests] == ["GET", "POST"]
@@ -0,0 +1,61 @@
+"""
+Benchmark comparing token creation & deletion by operating on the page and in
+hybrid mode (direct form posts) against a local Warehouse stub.
+
+Requires Chromium to be installed for Playwright. Disabled unless
+``PYPITOKENCLIENT_TEST_BENCHMARK`` is set to 1.
+"""
+import asyncio
+from os import getenv
+from time import perf_counter
+
+import pytest
+from warehouse_stub import WarehouseStub
+
+from pypi_token_client import (
+    PypiCredentials,
+    SingleProject,
+    async_pypi_token_client,
+)
+
+enabled = bool(int(getenv("PYPITOKENCLIENT_TEST_BENCHMARK", "0")))
+# number of create/delete pairs to measure for each mode
+runs = int(getenv("PYPITOKENCLIENT_TEST_BENCHMARK_RUNS", "5"))
+
+pytestmark = pytest.mark.skipif(not enabled, reason="benchmarks not enabled")
+
+
+async def _measure(stub: WarehouseStub, hybrid: bool) -> float:
+    """
+    Mean duration of creating and deleting a token.
+    """
+    credentials = PypiCredentials(stub.username, stub.password)
+    project = SingleProject(stub.projects[0])
+    async with async_pypi_token_client(
+        credentials, headless=True, base_url=stub.base_url, hybrid=hybrid
+    ) as session:
+        await session.login()
+        await session.get_token_list()
+        start = perf_counter()
+        for i in range(runs):
+            token = await session.create_token(f"bench{i}", project)
+            assert token.startswith("pypi-")
+            assert f"bench{i}" in stub.tokens
+            await session.delete_token(f"bench{i}")
+            assert f"bench{i}" not in stub.tokens
+        duration = (perf_counter() - start) / runs
+        # the session's snapshot was kept up to date without reloading
+        cached = await session.get_token_list(use_cache=True)
+        assert [t.name for t in cached] == list(stub.tokens)
+        return duration
+
+
+def test_hybrid_mode_is_faster():
+    with WarehouseStub() as stub:
+        page_duration = asyncio.run(_measure(stub, hybrid=False))
+        hybrid_duration = asyncio.run(_measure(stub, hybrid=True))
+    print(
+        f"page: {page_duration:.3f}s per create & delete; "
+        f"hybrid: {hybrid_duration:.3f}s"
+    )
+    assert hybrid_duration < page_duration
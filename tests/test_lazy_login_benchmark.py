@@ -0,0 +1,69 @@
+"""
+Benchmark comparing eager and lazy login in the CLI app against a local
+Warehouse stub.
+
+Requires Chromium to be installed for Playwright. Disabled unless
+``PYPITOKENCLIENT_TEST_BENCHMARK`` is set to 1.
+"""
+from os import getenv
+from time import perf_counter
+
+import pytest
+from warehouse_stub import WarehouseStub
+
+from pypi_token_client.app import App
+
+enabled = bool(int(getenv("PYPITOKENCLIENT_TEST_BENCHMARK", "0")))
+# number of CLI invocations to measure for each mode
+runs = int(getenv("PYPITOKENCLIENT_TEST_BENCHMARK_RUNS", "5"))
+
+pytestmark = pytest.mark.skipif(not enabled, reason="benchmarks not enabled")
+
+
+def _measure(stub: WarehouseStub, app: App) -> tuple[float, float]:
+    """
+    Mean number of page loads and duration of listing tokens with ``app``.
+    """
+    requests_before = len(stub.requests)
+    start = perf_counter()
+    for _ in range(runs):
+        app.list_tokens()
+    duration = perf_counter() - start
+    page_loads = sum(
+        method == "GET" for method, _ in stub.requests[requests_before:]
+    )
+    return page_loads / runs, duration / runs
+
+
+@pytest.mark.parametrize("persist", [False, True])
+def test_lazy_login_saves_navigation(tmp_path, persist):
+    with WarehouseStub() as stub:
+        apps = {
+            lazy_login: App(
+                headless=True,
+                # browser state is kept between invocations when persisting,
+                # so only the first one of each mode has to log in
+                persist_to=(
+                    tmp_path / f"lazy-{lazy_login}" if persist else None
+                ),
+                username=stub.username,
+                password=stub.password,
+                pypi_base_url=stub.base_url,
+                lazy_login=lazy_login,
+            )
+            for lazy_login in (False, True)
+        }
+        if persist:
+            for app in apps.values():
+                app.list_tokens()  # warm up persisted state
+        eager_loads, eager_duration = _measure(stub, apps[False])
+        lazy_loads, lazy_duration = _measure(stub, apps[True])
+    print(
+        f"eager: {eager_loads:.1f} page loads, {eager_duration:.3f}s; "
+        f"lazy: {lazy_loads:.1f} page loads, {lazy_duration:.3f}s"
+    )
+    if persist:
+        # already logged in => the login page visit is pure overhead
+        assert lazy_loads < eager_loads
+    else:
+        assert lazy_loads <= eager_loads
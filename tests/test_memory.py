@@ -0,0 +1,33 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pypi_token_client.utils.memory import (
+    get_descendant_pids,
+    get_descendants_rss,
+    get_rss,
+)
+
+pytestmark = pytest.mark.skipif(
+    not Path("/proc/self/status").exists(), reason="no /proc available"
+)
+
+
+def test_get_rss_of_current_process():
+    rss = get_rss()
+    assert rss is not None and rss > 0
+
+
+def test_descendants_include_child_process():
+    child = subprocess.Popen(
+        [sys.executable, "-c", "import time; time.sleep(10)"]
+    )
+    try:
+        assert child.pid in get_descendant_pids()
+        rss = get_descendants_rss()
+        assert rss is not None and rss > 0
+    finally:
+        child.kill()
+        child.wait()
@@ -0,0 +1,41 @@
+import json
+
+from pypi_token_client.metrics import MetricsRecorder
+
+
+def _make_recorder() -> MetricsRecorder:
+    metrics = MetricsRecorder(buckets=(1.0, 5.0))
+    metrics.record_operation("create_token", "success", 0.5)
+    metrics.record_operation("create_token", "success", 3.0)
+    metrics.record_operation("create_token", "TokenNameError", 7.0)
+    metrics.record_login()
+    return metrics
+
+
+def test_prometheus_format():
+    text = _make_recorder().to_prometheus()
+    lines = text.splitlines()
+    assert (
+        'pypi_token_client_operations_total{operation="create_token",'
+        'outcome="success"} 2'
+    ) in lines
+    assert (
+        "pypi_token_client_operation_duration_seconds_bucket{"
+        'operation="create_token",le="5.0"} 2'
+    ) in lines
+    assert (
+        "pypi_token_client_operation_duration_seconds_bucket{"
+        'operation="create_token",le="+Inf"} 3'
+    ) in lines
+    assert "pypi_token_client_logins_total 1" in lines
+
+
+def test_write_json(tmp_path):
+    path = tmp_path / "metrics.json"
+    _make_recorder().write(path)
+    data = json.loads(path.read_text())
+    assert data["logins"] == 1
+    assert data["latencies"]["create_token"]["count"] == 3
+    assert {"operation": "create_token", "outcome": "success", "count": 2} in (
+        data["operations"]
+    )
@@ -0,0 +1,130 @@
+"""
+Soak test driving a single session through many operations against a local
+Warehouse stub, checking that memory usage and latency don't drift upwards.
+
+Requires Chromium to be installed for Playwright. Disabled unless the number
+of operations to perform is set via ``PYPITOKENCLIENT_TEST_SOAK_OPERATIONS``.
+"""
+import asyncio
+from dataclasses import dataclass
+from os import getenv
+from time import perf_counter
+
+import pytest
+from warehouse_stub import WarehouseStub
+
+from pypi_token_client import (
+    PypiCredentials,
+    SingleProject,
+    async_pypi_token_client,
+)
+from pypi_token_client.utils.memory import get_descendants_rss, get_rss
+
+operations = int(getenv("PYPITOKENCLIENT_TEST_SOAK_OPERATIONS", "0"))
+# take a sample every this many operations
+sample_interval = int(
+    getenv("PYPITOKENCLIENT_TEST_SOAK_SAMPLE_INTERVAL", "50")
+)
+# maximum allowed growth slopes (fitted over all samples after warmup)
+max_python_rss_slope = float(
+    getenv("PYPITOKENCLIENT_TEST_SOAK_MAX_PYTHON_RSS_SLOPE", "2048")
+)  # bytes per operation
+max_browser_rss_slope = float(
+    getenv("PYPITOKENCLIENT_TEST_SOAK_MAX_BROWSER_RSS_SLOPE", "8192")
+)  # bytes per operation
+max_latency_slope = float(
+    getenv("PYPITOKENCLIENT_TEST_SOAK_MAX_LATENCY_SLOPE", "0.0001")
+)  # seconds per operation
+# fraction of samples to disregard at the start (caches filling up etc.)
+warmup_fraction = 0.2
+
+pytestmark = pytest.mark.skipif(
+    operations <= 0, reason="number of soak test operations not set"
+)
+
+
+@dataclass
+class Sample:
+    operation_index: int
+    python_rss: int | None
+    browser_rss: int | None
+    latency: float
+    "Mean latency of the operations since the previous sample"
+
+
+def slope(xs: list[float], ys: list[float]) -> float:
+    """
+    Slope of the least-squares linear fit through the given points.
+    """
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if variance == 0:
+        return 0.0
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    return covariance / variance
+
+
+async def _soak(stub: WarehouseStub) -> list[Sample]:
+    credentials = PypiCredentials(stub.username, stub.password)
+    project = SingleProject(stub.projects[0])
+    samples = []
+    latency_sum = 0.0
+    async with async_pypi_token_client(
+        credentials, headless=True, base_url=stub.base_url
+    ) as session:
+        for i in range(operations):
+            # mix of operations resembling typical usage
+            start = perf_counter()
+            if i % 3 == 0:
+                await session.create_token(f"soak{i}", project)
+            elif i % 3 == 1:
+                await session.get_token_list()
+            else:
+                await session.delete_token(f"soak{i - 2}")
+            latency_sum += perf_counter() - start
+            if (i + 1) % sample_interval == 0:
+                samples.append(
+                    Sample(
+                        i,
+                        get_rss(),
+                        get_descendants_rss(),
+                        latency_sum / sample_interval,
+                    )
+                )
+                latency_sum = 0.0
+    return samples
+
+
+def _assert_slope_below(
+    samples: list[Sample], attr: str, max_slope: float
+) -> None:
+    points = [
+        (s.operation_index, getattr(s, attr))
+        for s in samples
+        if getattr(s, attr) is not None
+    ]
+    if len(points) < 2:
+        # e.g. RSS can't be determined on this platform
+        print(f"not enough {attr} samples, not checking")
+        return
+    xs, ys = zip(*points)
+    fitted_slope = slope(list(xs), list(ys))
+    print(f"{attr} slope: {fitted_slope:.6g}/op")
+    assert fitted_slope <= max_slope, (
+        f"{attr} grows by {fitted_slope:.6g}/op "
+        f"(allowed: {max_slope:.6g}/op)"
+    )
+
+
+def test_soak():
+    with WarehouseStub() as stub:
+        samples = asyncio.run(_soak(stub))
+    warmup_samples = int(len(samples) * warmup_fraction)
+    samples = samples[warmup_samples:]
+    for sample in samples:
+        print(sample)
+    _assert_slope_below(samples, "python_rss", max_python_rss_slope)
+    _assert_slope_below(samples, "browser_rss", max_browser_rss_slope)
+    _assert_slope_below(samples, "latency", max_latency_slope)
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime
+
+from pypi_token_client import SingleProject, TokenListEntry
+from pypi_token_client.metrics import MetricsRecorder
+
+
+def _entry(name):
+    return TokenListEntry(
+        name, SingleProject("myproject"), datetime(2023, 1, 1), None
+    )
+
+
+def test_snapshot_is_patched_after_writes(make_session):
+    session = make_session()
+    session._token_snapshot = [_entry("a"), _entry("b")]
+    session._snapshot_created("c", SingleProject("other"))
+    session._snapshot_deleted("a", None)
+    cached = asyncio.run(session.get_token_list(use_cache=True))
+    assert [t.name for t in cached] == ["b", "c"]
+    assert cached[1].scope == SingleProject("other")
+
+
+def test_snapshot_is_replaced_by_list_read_after_delete(make_session):
+    session = make_session()
+    session._token_snapshot = [_entry("a"), _entry("b")]
+    session._snapshot_deleted("a", [_entry("b"), _entry("external")])
+    cached = asyncio.run(session.get_token_list(use_cache=True))
+    assert [t.name for t in cached] == ["b", "external"]
+
+
+def test_no_snapshot_is_made_up_by_writes(make_session):
+    session = make_session()
+    session._snapshot_created("c", SingleProject("other"))
+    assert session._token_snapshot is None
+
+
+def test_cache_hits_are_not_operations(make_session):
+    session = make_session()
+    session.metrics = MetricsRecorder()
+    session._token_snapshot = [_entry("a")]
+    session._projects = ["myproject"]
+
+    async def _run():
+        # would block if the cache hits waited for the lock
+        async with session._lock:
+            return (
+                await session.get_token_list(use_cache=True),
+                await session.list_projects(use_cache=True),
+            )
+
+    tokens, projects = asyncio.run(_run())
+    assert [t.name for t in tokens] == ["a"]
+    assert projects == ["myproject"]
+    assert session.metrics.operations == {}
+    assert session._operations_since_recycle == 0
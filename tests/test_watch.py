@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from pypi_token_client.common import (
+    AllProjects,
+    PasswordError,
+    SingleProject,
+    TokenListEntry,
+)
+from pypi_token_client.watch import diff_token_lists, watch_token_list
+
+
+def _entry(name, last_used=None):
+    return TokenListEntry(
+        name, SingleProject("myproject"), datetime(2023, 1, 1), last_used
+    )
+
+
+def test_diff_token_lists():
+    old = [_entry("kept"), _entry("used"), _entry("gone")]
+    new = [
+        _entry("used", datetime(2023, 2, 1)),
+        _entry("kept"),
+        _entry("new"),
+    ]
+    changes = diff_token_lists(old, new)
+    assert [(c.kind, c.token.name) for c in changes] == [
+        ("removed", "gone"),
+        ("changed", "used"),
+        ("added", "new"),
+    ]
+    assert changes[1].previous == _entry("used")
+    assert changes[1].to_dict()["token"]["last_used"] == "2023-02-01T00:00:00"
+
+
+def test_diff_token_lists_detects_scope_change():
+    old = [_entry("a")]
+    new = [TokenListEntry("a", AllProjects(), datetime(2023, 1, 1), None)]
+    (change,) = diff_token_lists(old, new)
+    assert change.kind == "changed"
+    assert change.to_dict()["token"]["project"] is None
+
+
+class _FakeSession:
+    def __init__(self, snapshots):
+        self.snapshots = iter(snapshots)
+
+    async def refresh_token_list(self, *, timeout=None):
+        snapshot = next(self.snapshots)
+        if isinstance(snapshot, Exception):
+            raise snapshot
+        return snapshot
+
+
+async def _first_changes(session, n, **kwargs):
+    results = []
+    async for _, changes in watch_token_list(session, 0, **kwargs):
+        results.append([(c.kind, c.token.name) for c in changes])
+        if len(results) == n:
+            return results
+
+
+def test_watch_token_list_only_yields_changes():
+    session = _FakeSession(
+        [[_entry("a")], [_entry("a")], [_entry("a"), _entry("b")], [], []]
+    )
+    assert asyncio.run(_first_changes(session, 2)) == [
+        [("added", "b")],
+        [("removed", "a"), ("removed", "b")],
+    ]
+
+
+def test_watch_token_list_emit_initial():
+    session = _FakeSession([[_entry("a")]])
+    assert asyncio.run(_first_changes(session, 1, emit_initial=True)) == [
+        [("added", "a")]
+    ]
+
+
+def test_watch_token_list_skips_failed_polls():
+    session = _FakeSession(
+        [[_entry("a")], RuntimeError("network down"), [_entry("b")]]
+    )
+    assert asyncio.run(_first_changes(session, 1)) == [
+        [("removed", "a"), ("added", "b")]
+    ]
+
+
+def test_watch_token_list_stops_on_login_failure():
+    session = _FakeSession([[_entry("a")], PasswordError("wrong password")])
+    with pytest.raises(PasswordError):
+        asyncio.run(_first_changes(session, 1))
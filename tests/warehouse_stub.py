@@ -0,0 +1,411 @@
+"""
+Minimal local stand-in for the parts of PyPI's web interface (Warehouse) that
+the client interacts with.
+
+Only meant for tests that need a browser but shouldn't contact PyPI, like
+soak tests and benchmarks. The HTML only mimics the structure the client
+relies on, not the looks.
+"""
+import secrets
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from html import escape
+from http import cookies
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import time
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+_options_script = """
+<script>
+  document.addEventListener("click", (event) => {
+    const optionsButton = event.target.closest(".options-button");
+    if (optionsButton) {
+      optionsButton.parentElement.querySelector(".options-menu")
+        .hidden = false;
+      return;
+    }
+    const removeLink = event.target.closest(".remove-link");
+    if (removeLink) {
+      event.preventDefault();
+      document.getElementById(removeLink.dataset.dialog).hidden = false;
+    }
+  });
+</script>
+"""
+
+
+@dataclass
+class StubToken:
+    name: str
+    project: str | None
+    macaroon_id: str = field(default_factory=lambda: secrets.token_hex(8))
+    created: datetime = field(
+        default_factory=lambda: datetime.now(timezone.utc)
+    )
+    last_used: datetime | None = None
+
+
+@dataclass
+class _StubSession:
+    username: str
+    csrf_token: str = field(default_factory=lambda: secrets.token_hex(16))
+    confirmed_at: float = field(default_factory=time)
+    flash: str | None = None
+
+
+class WarehouseStub:
+    """
+    Warehouse-like HTTP server running in a background thread.
+
+    Args:
+        username: Username of the only account.
+        password: Password of the only account.
+        projects: Names of the projects the account owns.
+        sudo_window: Number of seconds after logging in or confirming the
+            password during which no password confirmation is required.
+            ``None`` means it's never required.
+    """
+
+    def __init__(
+        self,
+        username: str = "stubuser",
+        password: str = "stubpassword",
+        projects: tuple[str, ...] = ("stubproject",),
+        sudo_window: float | None = None,
+    ):
+        self.username = username
+        self.password = password
+        self.projects = list(projects)
+        self.sudo_window = sudo_window
+        self.tokens: dict[str, StubToken] = {}
+        self.requests: list[tuple[str, str]] = []
+        "Method and path of each request received so far"
+        self._sessions: dict[str, _StubSession] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), _make_handler(self)
+        )
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+
+    @property
+    def base_url(self) -> str:
+        port = self._server.server_address[1]
+        return f"http://127.0.0.1:{port}"
+
+    def start(self) -> "WarehouseStub":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self) -> "WarehouseStub":
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def touch_token(self, name: str):
+        """
+        Mark a token as just used.
+        """
+        with self._lock:
+            self.tokens[name].last_used = datetime.now(timezone.utc)
+
+
+def _make_handler(stub: WarehouseStub):
+    class Handler(_WarehouseStubHandler):
+        pass
+
+    Handler.stub = stub
+    return Handler
+
+
+class _WarehouseStubHandler(BaseHTTPRequestHandler):
+    stub: WarehouseStub
+
+    def log_message(self, format, *args):
+        pass
+
+    # request plumbing
+
+    def _path(self) -> str:
+        return urlsplit(self.path).path
+
+    def _query(self) -> dict[str, str]:
+        return {
+            k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()
+        }
+
+    def _form(self) -> dict[str, str]:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode()
+        return {k: v[0] for k, v in parse_qs(body).items()}
+
+    def _session(self) -> tuple[str | None, _StubSession | None]:
+        jar = cookies.SimpleCookie(self.headers.get("Cookie", ""))
+        morsel = jar.get("session_id")
+        if morsel is None:
+            return None, None
+        return morsel.value, self.stub._sessions.get(morsel.value)
+
+    def _send_html(self, body: str, status: int = 200, headers=()):
+        content = f"<!DOCTYPE html><html><body>{body}</body></html>".encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _redirect(self, location: str, headers=()):
+        self.send_response(303)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str):
+        stub = self.stub
+        path = self._path()
+        stub.requests.append((method, path))
+        form = self._form() if method == "POST" else {}
+        with stub._lock:
+            if path == "/account/login/":
+                return self._login(method, form)
+            if path not in ("/manage/account/", "/manage/account/token/"):
+                return self._send_html("<h1>Not found</h1>", 404)
+            session_id, session = self._session()
+            if session is None:
+                return self._redirect(
+                    "/account/login/?" + urlencode({"next": path})
+                )
+            if method == "POST" and "confirm_password_form" in form:
+                return self._confirm_password(path, session, form)
+            if stub.sudo_window is not None and (
+                time() - session.confirmed_at > stub.sudo_window
+            ):
+                return self._confirm_password_page(session)
+            if method == "POST" and form.get("csrf_token") != (
+                session.csrf_token
+            ):
+                return self._send_html("<h1>Invalid CSRF token</h1>", 400)
+            if path == "/manage/account/":
+                return self._account_page(session)
+            if method == "GET":
+                return self._token_page(session)
+            if "macaroon_id" in form:
+                return self._delete_token(session, form)
+            return self._create_token(session, form)
+
+    # pages
+
+    def _header(self, session: _StubSession | None) -> str:
+        if session is None:
+            return "<header><a href='/account/login/'>Log in</a></header>"
+        return (
+            "<header><div id='user-indicator'>"
+            f"<nav><button>{escape(session.username)}</button></nav>"
+            "<nav><a href='/manage/account/'>Account settings</a></nav>"
+            "</div></header>"
+        )
+
+    def _errors(self, field_id: str, errors: list[str]) -> str:
+        if not errors:
+            return ""
+        items = "".join(f"<li>{escape(e)}</li>" for e in errors)
+        return f"<div id='{field_id}-errors'><ul>{items}</ul></div>"
+
+    def _login(self, method: str, form: dict[str, str]):
+        stub = self.stub
+        next_path = self._query().get("next", "/manage/account/")
+        username_errors: list[str] = []
+        password_errors: list[str] = []
+        if method == "GET" and self._session()[1] is not None:
+            # already logged in
+            return self._redirect(next_path)
+        if method == "POST":
+            if form.get("username") != stub.username:
+                username_errors.append("No user found with that username")
+            elif form.get("password") != stub.password:
+                password_errors.append("The password is invalid. Try again.")
+            else:
+                session_id = secrets.token_hex(16)
+                stub._sessions[session_id] = _StubSession(stub.username)
+                return self._redirect(
+                    next_path,
+                    [
+                        (
+                            "Set-Cookie",
+                            f"session_id={session_id}; Path=/; Max-Age=86400",
+                        )
+                    ],
+                )
+        self._send_html(
+            self._header(None)
+            + "<h1>Log in to PyPI</h1>"
+            + "<form method='POST' action='/account/login/?"
+            + escape(urlencode({"next": next_path}))
+            + "'>"
+            + "<input id='username' name='username' type='text'>"
+            + self._errors("username", username_errors)
+            + "<input id='password' name='password' type='password'>"
+            + self._errors("password", password_errors)
+            + "<input type='submit' value='Log in'>"
+            + "</form>"
+        )
+
+    def _confirm_password_page(self, session: _StubSession, error=None):
+        self._send_html(
+            self._header(session)
+            + "<h1>Confirm password to continue</h1>"
+            + "<form method='POST'>"
+            + "<input type='hidden' name='confirm_password_form' value='1'>"
+            + "<input id='password' name='password' type='password'>"
+            + self._errors("password", [error] if error else [])
+            + "</form>"
+        )
+
+    def _confirm_password(self, path, session, form):
+        if form.get("password") != self.stub.password:
+            return self._confirm_password_page(
+                session, "The password is invalid. Try again."
+            )
+        session.confirmed_at = time()
+        self._redirect(path)
+
+    def _token_rows(self, session: _StubSession) -> str:
+        rows = []
+        for token in self.stub.tokens.values():
+            dialog_id = f"remove-{token.macaroon_id}"
+            scope = "All projects" if token.project is None else token.project
+            last_used = (
+                f"<time datetime='{token.last_used.isoformat()}'>"
+                f"{token.last_used:%b %d, %Y}</time>"
+                if token.last_used is not None
+                else "Never"
+            )
+            rows.append(
+                "<tr>"
+                f"<th scope='row'>{escape(token.name)}</th>"
+                f"<td>{escape(scope)}</td>"
+                f"<td><time datetime='{token.created.isoformat()}'>"
+                f"{token.created:%b %d, %Y}</time></td>"
+                f"<td>{last_used}</td>"
+                "<td><nav>"
+                "<button type='button' class='options-button'>Options</button>"
+                "<div class='options-menu' hidden>"
+                f"<a href='#' class='remove-link' data-dialog='{dialog_id}'>"
+                "Remove token</a>"
+                "</div></nav>"
+                f"<div role='dialog' id='{dialog_id}' hidden>"
+                f"<h3>Remove API token - {escape(token.name)}</h3>"
+                "<form method='POST' action='/manage/account/token/'>"
+                "<input type='hidden' name='csrf_token' "
+                f"value='{session.csrf_token}'>"
+                "<input type='hidden' name='macaroon_id' "
+                f"value='{token.macaroon_id}'>"
+                "<input type='password' name='confirm_password'>"
+                "</form></div>"
+                "</td></tr>"
+            )
+        return "".join(rows)
+
+    def _account_page(self, session: _StubSession):
+        flash = ""
+        if session.flash is not None:
+            flash = f"<div class='notification'>{escape(session.flash)}</div>"
+            session.flash = None
+        table = ""
+        if self.stub.tokens:
+            table = (
+                "<table><thead><tr><th>Name</th><th>Scope</th>"
+                "<th>Created</th><th>Last used</th><th></th></tr></thead>"
+                f"<tbody>{self._token_rows(session)}</tbody></table>"
+            )
+        self._send_html(
+            self._header(session)
+            + flash
+            + "<h1>Account settings</h1>"
+            + f"<section id='api-tokens'><h2>API tokens</h2>{table}</section>"
+            + _options_script
+        )
+
+    def _token_page(self, session, description="", name_errors=()):
+        options = (
+            "<option value='scope:user'>Entire account</option>"
+            + "".join(
+                f"<option value='scope:project:{escape(p)}'>"
+                f"Project: {escape(p)}</option>"
+                for p in self.stub.projects
+            )
+        )
+        self._send_html(
+            self._header(session)
+            + "<h1>Add API token</h1>"
+            + "<form method='POST' action='/manage/account/token/'>"
+            + "<input type='hidden' name='csrf_token' "
+            + f"value='{session.csrf_token}'>"
+            + "<input id='description' name='description' type='text' "
+            + f"value='{escape(description)}'>"
+            + self._errors("token-name", list(name_errors))
+            + f"<select id='token_scope' name='token_scope'>{options}</select>"
+            + "</form>"
+        )
+
+    def _create_token(self, session, form):
+        stub = self.stub
+        name = form.get("description", "")
+        scope = form.get("token_scope", "")
+        if not name:
+            return self._token_page(session, name, ["Specify a token name"])
+        if name in stub.tokens:
+            return self._token_page(
+                session,
+                name,
+                [
+                    "You have already created a token with that name. "
+                    "Choose a different name."
+                ],
+            )
+        if scope == "scope:user":
+            project = None
+        elif scope.startswith("scope:project:") and (
+            scope.removeprefix("scope:project:") in stub.projects
+        ):
+            project = scope.removeprefix("scope:project:")
+        else:
+            return self._send_html("<h1>Invalid scope</h1>", 400)
+        stub.tokens[name] = StubToken(name, project)
+        token = "pypi-" + secrets.token_urlsafe(48)
+        self._send_html(
+            self._header(session)
+            + "<h1>Add API token</h1>"
+            + f"<p>Token for {escape(name)}</p>"
+            + f"<div id='provisioned-key'><code>{token}</code></div>"
+        )
+
+    def _delete_token(self, session, form):
+        stub = self.stub
+        if form.get("confirm_password") != stub.password:
+            session.flash = "Invalid credentials. Try again"
+            return self._redirect("/manage/account/")
+        for token in list(stub.tokens.values()):
+            if token.macaroon_id == form["macaroon_id"]:
+                del stub.tokens[token.name]
+                session.flash = f"Deleted API token '{token.name}'."
+                break
+        self._redirect("/manage/account/")